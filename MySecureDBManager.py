@@ -1,336 +1,3251 @@
-import mysql.connector
-import bcrypt
-import re
+from __future__ import annotations
+
+import argparse
+import bisect
+import configparser
+import contextlib
+import csv
+import fnmatch
+import functools
+import gzip
+import hashlib
+import hmac
+import json
 import os
-import sys
-from getpass import getpass
-from typing import Dict, List, Optional, Tuple, Union
+import queue
 import re
-import os
 import sys
-import hashlib
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from getpass import getpass
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+
+class _LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    Keeps the MySQL driver, bcrypt, asyncio and friends off the startup path
+    of CLI invocations that never reach them. ``load`` performs the import
+    with a plain import statement, so PyInstaller still finds and bundles
+    the module.
+    """
+
+    def __init__(self, load: Callable):
+        self._load = load
+        self._module = None
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        if self._module is None:
+            self._module = self._load()
+        return getattr(self._module, attr)
+
+
+def _import_mysql():
+    import mysql.connector
+    return mysql
+
+
+def _import_bcrypt():
+    import bcrypt
+    return bcrypt
+
+
+def _import_asyncio():
+    import asyncio
+    return asyncio
+
+
+def _import_sqlite3():
+    import sqlite3
+    return sqlite3
+
+
+def _import_futures():
+    import concurrent.futures
+    return concurrent.futures
+
+
+mysql = _LazyModule(_import_mysql)
+bcrypt = _LazyModule(_import_bcrypt)
+asyncio = _LazyModule(_import_asyncio)
+sqlite3 = _LazyModule(_import_sqlite3)
+futures = _LazyModule(_import_futures)
+
+SETTINGS_FILE = os.path.join(os.path.expanduser("~"), ".mysecuredbmanager.json")
+
+USER_COLUMNS = ('userId', 'firstName', 'lastName', 'email', 'accessLevel')
+PAGE_SIZE = 20
+
+CREATE_USER_TABLE = """
+CREATE TABLE IF NOT EXISTS User (
+    userId INT AUTO_INCREMENT PRIMARY KEY,
+    firstName VARCHAR(50) NOT NULL,
+    lastName VARCHAR(50) NOT NULL,
+    email VARCHAR(100) NOT NULL,
+    accessLevel ENUM('basic', 'admin') DEFAULT 'basic'
+)
+"""
+
+CREATE_LOGIN_TABLE = """
+CREATE TABLE IF NOT EXISTS Login (
+    loginId INT AUTO_INCREMENT PRIMARY KEY,
+    userId INT UNIQUE,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    FOREIGN KEY (userId) REFERENCES User(userId) ON DELETE CASCADE
+)
+"""
+
+CREATE_SCHEMA_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# Ordered (version, description, steps). A step is either an idempotent SQL
+# statement or an index spec for DatabaseManager._ensure_index. Never edit an
+# applied migration; append a new one instead.
+# The unique email index comes last: it fails on a table holding duplicate
+# emails, and every index before it should still be built in that case
+SCHEMA_MIGRATIONS = [
+    (1, "Create User and Login tables", [CREATE_USER_TABLE, CREATE_LOGIN_TABLE]),
+    (2, "Name search indexes on User", [
+        {'table': 'User', 'name': 'idx_user_last_first', 'columns': 'lastName, firstName'},
+        {'table': 'User', 'name': 'idx_user_first_name', 'columns': 'firstName'},
+    ]),
+    (3, "Access level index on User", [
+        {'table': 'User', 'name': 'idx_user_access_level', 'columns': 'accessLevel'},
+    ]),
+    (4, "Unique index on User.email", [
+        {'table': 'User', 'name': 'uq_user_email', 'columns': 'email', 'unique': True},
+    ]),
+]
+
+# MySQL error codes handled explicitly
+ER_PARSE_ERROR = 1064
+ER_DUP_ENTRY = 1062
+ER_NO_SUCH_TABLE = 1146
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_NO_REFERENCED_ROW_2 = 1452
+ER_ALTER_OPERATION_NOT_SUPPORTED = 1845
+ER_ALTER_OPERATION_NOT_SUPPORTED_REASON = 1846
+
+IMPORT_BATCH_SIZE = 1000
+DELETE_CHUNK_SIZE = 1000
+READ_STRATEGIES = ('round_robin', 'least_latency')
+# SHOW REPLICA STATUS needs MySQL 8.0.22 / MariaDB 10.5.1; older servers only know SHOW SLAVE STATUS
+REPLICA_STATUS_STATEMENTS = ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS")
+REPLICA_LAG_COLUMNS = ('Seconds_Behind_Source', 'Seconds_Behind_Master')
+# Seconds to wait for a replica to accept a connection before treating it as down
+REPLICA_CONNECT_TIMEOUT = 2
+# Client errors meaning the server is down or the connection broke: can't connect,
+# server gone away, lost connection (plain and with a system error)
+CONNECTION_ERRNOS = (2003, 2006, 2013, 2055)
+EXPORT_BATCH_SIZE = 10000
+# One statement shape per table for partial updates: a NULL parameter keeps the
+# current value, so every combination of supplied fields reuses one prepared statement
+UPDATE_USER_SQL = ("UPDATE User SET firstName = COALESCE(%s, firstName), lastName = COALESCE(%s, lastName), "
+                   "email = COALESCE(%s, email), accessLevel = COALESCE(%s, accessLevel) WHERE userId = %s")
+UPDATE_LOGIN_SQL = ("UPDATE Login SET username = COALESCE(%s, username), password = COALESCE(%s, password) "
+                    "WHERE userId = %s")
+INDEX_EXISTS_SQL = ("SELECT 1 FROM information_schema.STATISTICS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1")
+EXPORT_COLUMNS = ('userId', 'firstName', 'lastName', 'email', 'accessLevel', 'loginId', 'username')
+IMPORT_FIELDS = ['first_name', 'last_name', 'email', 'access_level', 'username', 'password']
+
+# Column names accepted in import files, mapped to the keyword names used by insert_user/insert_login
+IMPORT_FIELD_ALIASES = {
+    'firstName': 'first_name',
+    'lastName': 'last_name',
+    'accessLevel': 'access_level',
+}
+
+
+class UserRecord(NamedTuple):
+    """Compact, immutable User row (a tuple with named fields)."""
+    userId: int
+    firstName: str
+    lastName: str
+    email: str
+    accessLevel: str
+
+
+class LoginRecord(NamedTuple):
+    """Compact Login row joined with its User, as returned by select_login_by_username."""
+    loginId: int
+    userId: int
+    username: str
+    password: str
+    firstName: str
+    lastName: str
+    email: str
+    accessLevel: str
+
+
+UserRow = Union[Dict, UserRecord]
+LoginRow = Union[Dict, LoginRecord]
+
+
+class UserTable:
+    """Column-oriented container for large user listings.
+
+    IDs live in an int array, access levels as one byte each, and repeated
+    first/last names are interned, so a million rows costs a fraction of a
+    list of dicts. Indexing or iterating yields UserRecord rows.
+    """
+
+    __slots__ = ('userId', 'firstName', 'lastName', 'email', '_access_codes')
+    ACCESS_LEVELS = ('basic', 'admin')
 
-class DatabaseManager:
     def __init__(self):
+        self.userId = array('q')
+        self.firstName = []
+        self.lastName = []
+        self.email = []
+        self._access_codes = array('b')
+
+    def append(self, row: Tuple):
+        user_id, first_name, last_name, email, access_level = row
+        self.userId.append(user_id)
+        self.firstName.append(sys.intern(first_name))
+        self.lastName.append(sys.intern(last_name))
+        self.email.append(email)
+        self._access_codes.append(self.ACCESS_LEVELS.index(access_level) if access_level in self.ACCESS_LEVELS else -1)
+
+    def extend(self, rows: Iterable[Tuple]):
+        for row in rows:
+            self.append(row)
+
+    @property
+    def accessLevel(self) -> List[Optional[str]]:
+        return [self.ACCESS_LEVELS[code] if code >= 0 else None for code in self._access_codes]
+
+    def __len__(self) -> int:
+        return len(self.userId)
+
+    def __getitem__(self, index: int) -> UserRecord:
+        code = self._access_codes[index]
+        return UserRecord(self.userId[index], self.firstName[index], self.lastName[index], self.email[index],
+                          self.ACCESS_LEVELS[code] if code >= 0 else None)
+
+    def __iter__(self) -> Iterator[UserRecord]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_dicts(self) -> List[Dict]:
+        return [record._asdict() for record in self]
+
+
+def _hash_password(password: str, rounds: Optional[int] = None) -> str:
+    """Hash a password with bcrypt (module level so it can run in a worker process)."""
+    salt = bcrypt.gensalt(rounds) if rounds else bcrypt.gensalt()
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def bcrypt_cost(stored_password: str) -> Optional[int]:
+    """Return the cost factor encoded in a bcrypt hash ($2b$12$...), or None if unparseable."""
+    parts = stored_password.split('$')
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def calibrate_bcrypt_cost(target_ms: float = 250.0, min_cost: int = 10, max_cost: int = 16) -> int:
+    """Benchmark bcrypt on this machine and return the highest cost that hashes within target_ms.
+
+    Each extra cost step doubles the work, so the time at ``min_cost`` is
+    measured and extrapolated, then the chosen cost is checked for real.
+    """
+    def time_hash(cost: int) -> float:
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration-password", bcrypt.gensalt(cost))
+        return (time.perf_counter() - start) * 1000
+
+    base_ms = min(time_hash(min_cost) for _ in range(3))
+    cost = min_cost
+    while cost < max_cost and base_ms * 2 ** (cost + 1 - min_cost) <= target_ms:
+        cost += 1
+    while cost > min_cost and time_hash(cost) > target_ms:
+        cost -= 1
+    return cost
+
+
+def load_settings() -> Dict:
+    """Load saved manager settings (e.g. bcrypt cost) from SETTINGS_FILE."""
+    try:
+        with open(SETTINGS_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_settings(settings: Dict):
+    """Save manager settings to SETTINGS_FILE."""
+    with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, indent=2)
+
+
+def _check_password(entered_password: str, stored_password: str) -> bool:
+    """Check a password against a bcrypt hash (module level so it can run in a worker process)."""
+    return bcrypt.checkpw(entered_password.encode('utf-8'), stored_password.encode('utf-8'))
+
+
+def read_import_file(path: str) -> Iterator[Dict]:
+    """Stream user+login rows from a CSV (with header) or JSONL file."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith(('.jsonl', '.json', '.ndjson')):
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as err:
+                    yield {'_error': f"line {line_no}: invalid JSON ({err})", '_raw': line}
+                    continue
+                yield {IMPORT_FIELD_ALIASES.get(k, k): v for k, v in row.items()}
+        else:
+            for row in csv.DictReader(f):
+                yield {IMPORT_FIELD_ALIASES.get(k, k): v for k, v in row.items()}
+
+
+def _chunked(items: Iterable, size: int) -> Iterator[List]:
+    """Yield lists of at most ``size`` items."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _like_escape(value: str) -> str:
+    """Escape LIKE wildcards for use with ESCAPE '!'.
+
+    '!' rather than backslash: SQLite has no default LIKE escape, and '\\\\' is
+    one character in MySQL string literals but two in SQLite's.
+    """
+    return re.sub(r'([!%_])', r'!\1', value)
+
+
+def read_id_file(path: str) -> Iterator[int]:
+    """Stream integer IDs from a file: one per line, or the first column of a CSV."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if row and row[0].strip().isdigit():
+                yield int(row[0])
+
+
+def _validate_import_row(row: Dict) -> Optional[str]:
+    """Return an error message if an import row is unusable, otherwise None."""
+    if '_error' in row:
+        return row['_error']
+    missing = [field for field in IMPORT_FIELDS if field != 'access_level' and not row.get(field)]
+    if missing:
+        return f"missing field(s): {', '.join(missing)}"
+    access_level = (row.get('access_level') or 'basic').lower()
+    if access_level not in ['basic', 'admin']:
+        return f"invalid access level '{access_level}'"
+    row['access_level'] = access_level
+    return None
+
+
+@contextmanager
+def _open_export_writer(output, fmt: str):
+    """Yield a function that writes one chunk of EXPORT_COLUMNS tuples to ``output``."""
+    if fmt == 'parquet':
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet export needs pyarrow (pip install pyarrow)")
+        schema = pyarrow.schema([
+            ('userId', pyarrow.int32()), ('firstName', pyarrow.string()), ('lastName', pyarrow.string()),
+            ('email', pyarrow.string()), ('accessLevel', pyarrow.string()),
+            ('loginId', pyarrow.int32()), ('username', pyarrow.string()),
+        ])
+        writer = pyarrow.parquet.ParquetWriter(output, schema, compression='zstd')
+        try:
+            # One row group per chunk keeps memory bounded by the chunk size
+            yield lambda rows: writer.write_table(
+                pyarrow.Table.from_arrays([pyarrow.array(column) for column in zip(*rows)], schema=schema))
+        finally:
+            writer.close()
+        return
+
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError(f"Unknown export format '{fmt}'")
+    if isinstance(output, str):
+        opener = gzip.open if output.endswith('.gz') else open
+        stream = opener(output, 'wt', newline='', encoding='utf-8')
+    else:
+        stream = output
+    try:
+        if fmt == 'csv':
+            csv_writer = csv.writer(stream)
+            csv_writer.writerow(EXPORT_COLUMNS)
+            yield csv_writer.writerows
+        else:
+            yield lambda rows: stream.writelines(
+                json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + "\n" for row in rows)
+    finally:
+        if stream is not output:
+            stream.close()
+
+
+class MySQLBackend:
+    """The default storage backend: a MySQL/MariaDB server via mysql.connector."""
+
+    name = 'mysql'
+    label = "MySQL server"
+    supports_prepared = True
+
+    def connect(self, **connect_args):
+        # UPDATE reports matched rather than changed rows, so rewriting a row with
+        # its current values can't be mistaken for a missing row
+        connect_args.setdefault('client_flags', [mysql.connector.ClientFlag.FOUND_ROWS])
+        return mysql.connector.connect(**connect_args)
+
+
+# SQLite equivalents of MySQL statements the manager runs verbatim. Names are
+# NOCASE like MySQL's default collation, which also lets the name indexes serve
+# case-insensitive LIKE prefix searches.
+SQLITE_CREATE_USER_TABLE = """
+CREATE TABLE IF NOT EXISTS User (
+    userId INTEGER PRIMARY KEY AUTOINCREMENT,
+    firstName VARCHAR(50) NOT NULL COLLATE NOCASE,
+    lastName VARCHAR(50) NOT NULL COLLATE NOCASE,
+    email VARCHAR(100) NOT NULL,
+    accessLevel TEXT DEFAULT 'basic' CHECK (accessLevel IN ('basic', 'admin'))
+)
+"""
+
+SQLITE_CREATE_LOGIN_TABLE = """
+CREATE TABLE IF NOT EXISTS Login (
+    loginId INTEGER PRIMARY KEY AUTOINCREMENT,
+    userId INT UNIQUE REFERENCES User(userId) ON DELETE CASCADE,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    password VARCHAR(255) NOT NULL
+)
+"""
+
+_ALTER_ADD_INDEX = re.compile(
+    r"ALTER TABLE (\w+) ADD (UNIQUE )?INDEX (\w+) \(([^)]*)\)(, ALGORITHM=\w+, LOCK=\w+)?$", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def _sqlite_sql(operation: str) -> Optional[str]:
+    """Translate a MySQL statement for SQLite (None for statements that are no-ops there)."""
+    override = {
+        CREATE_USER_TABLE: SQLITE_CREATE_USER_TABLE,
+        CREATE_LOGIN_TABLE: SQLITE_CREATE_LOGIN_TABLE,
+        INDEX_EXISTS_SQL: "SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND name = ? LIMIT 1",
+    }.get(operation)
+    if override:
+        return override
+    sql = operation.strip()
+    upper = sql.upper()
+    if upper.startswith(('USE ', 'CREATE DATABASE ')):
+        return None  # one file is one database
+    if upper == 'SHOW DATABASES':
+        return "SELECT name FROM pragma_database_list"
+    match = _ALTER_ADD_INDEX.match(sql)
+    if match:
+        table, unique, name, columns, _ = match.groups()
+        return f"CREATE {unique or ''}INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+    sql = sql.replace('%s', '?')
+    if upper.startswith('INSERT IGNORE '):
+        sql = 'INSERT OR IGNORE ' + sql[len('INSERT IGNORE '):]
+    elif upper.startswith('EXPLAIN ') and not upper.startswith('EXPLAIN QUERY PLAN '):
+        sql = 'EXPLAIN QUERY PLAN ' + sql[len('EXPLAIN '):]
+    return re.sub(r'\bSUBSTRING\(', 'substr(', sql, flags=re.IGNORECASE)
+
+
+def _sqlite_error(err: Exception) -> Exception:
+    """Re-raise a sqlite3 error as mysql.connector.Error with the matching MySQL errno."""
+    message = str(err)
+    if 'UNIQUE constraint failed' in message:
+        errno = ER_DUP_ENTRY
+    elif 'FOREIGN KEY constraint failed' in message:
+        errno = ER_NO_REFERENCED_ROW_2
+    elif 'no such table' in message:
+        errno = ER_NO_SUCH_TABLE
+    elif 'database is locked' in message:
+        errno = ER_LOCK_WAIT_TIMEOUT
+    else:
+        errno = None
+    return mysql.connector.Error(msg=message, errno=errno)
+
+
+class _SQLiteCursor:
+    """mysql.connector-style cursor over sqlite3.
+
+    Takes %s placeholders, translates MySQL-only statements, and sets
+    lastrowid after a multi-row INSERT to the first new id as MySQL does.
+    """
+
+    def __init__(self, db):
+        self._db = db
+        self._cursor = db.cursor()
+        self.lastrowid = None
+        self.rowcount = -1
+        self._noop = False
+
+    @property
+    def description(self):
+        return None if self._noop else self._cursor.description
+
+    @property
+    def with_rows(self) -> bool:
+        return self.description is not None
+
+    def execute(self, operation, params=None):
+        sql = _sqlite_sql(operation)
+        self._noop = sql is None
+        if self._noop:
+            self.rowcount = 0
+            return
+        try:
+            self._cursor.execute(sql, params or ())
+        except sqlite3.Error as err:
+            raise _sqlite_error(err) from err
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = self._cursor.lastrowid
+
+    def executemany(self, operation, seq_params):
+        sql = _sqlite_sql(operation)
+        self._noop = False
+        try:
+            self._cursor.executemany(sql, seq_params)
+            self.rowcount = self._cursor.rowcount
+            if sql.lstrip().upper().startswith('INSERT') and self.rowcount > 0:
+                last_id = self._db.execute("SELECT last_insert_rowid()").fetchone()[0]
+                self.lastrowid = last_id - self.rowcount + 1
+        except sqlite3.Error as err:
+            raise _sqlite_error(err) from err
+
+    def fetchone(self):
+        return None if self._noop else self._cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        return [] if self._noop else self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return [] if self._noop else self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self.fetchall() if self._noop else self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+
+class _SQLiteConnection:
+    """mysql.connector-style connection over sqlite3."""
+
+    def __init__(self, db):
+        self._db = db
+
+    def cursor(self, *args, **kwargs):
+        # prepared/buffered don't apply to sqlite3
+        return _SQLiteCursor(self._db)
+
+    def commit(self):
+        try:
+            self._db.commit()
+        except sqlite3.Error as err:
+            raise _sqlite_error(err) from err
+
+    def rollback(self):
+        try:
+            self._db.rollback()
+        except sqlite3.Error as err:
+            raise _sqlite_error(err) from err
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._db.in_transaction
+
+    def ping(self, reconnect: bool = False):
+        pass
+
+    def reconnect(self, attempts: int = 1, delay: int = 0):
+        pass
+
+    def is_connected(self) -> bool:
+        return True
+
+    def close(self):
+        self._db.close()
+
+
+class SQLiteBackend:
+    """Embedded storage backend: a single SQLite file, for edge installs and CI.
+
+    Connections mimic the parts of mysql.connector the manager uses, so every
+    DatabaseManager method runs unchanged; errors surface as
+    mysql.connector.Error carrying the equivalent MySQL errno. The file is
+    opened in WAL mode so readers don't block the writer. ``pragmas``
+    overrides entries of PRAGMAS.
+    """
+
+    name = 'sqlite'
+    # sqlite3 already keeps compiled statements per connection (cached_statements)
+    supports_prepared = False
+    PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',  # durable across application crashes; WAL makes this safe
+        'foreign_keys': 'ON',  # Login rows cascade with their User
+        'busy_timeout': 5000,
+        'cache_size': -65536,  # 64 MB page cache
+        'temp_store': 'MEMORY',
+        'mmap_size': 268435456,
+    }
+
+    def __init__(self, path: str, pragmas: Dict = None):
+        self.path = path
+        self.pragmas = dict(self.PRAGMAS, **(pragmas or {}))
+        self.label = f"SQLite database {path}"
+
+    def connect(self, **connect_args):
+        # BEGIN IMMEDIATE takes the write lock up front instead of failing on upgrade
+        db = sqlite3.connect(self.path, timeout=self.pragmas['busy_timeout'] / 1000,
+                             check_same_thread=False, isolation_level='IMMEDIATE', cached_statements=256)
+        for pragma, value in self.pragmas.items():
+            db.execute(f"PRAGMA {pragma} = {value}")
+        return _SQLiteConnection(db)
+
+
+class ConnectionPool:
+    """A fixed-size, thread-safe pool of MySQL connections.
+
+    Connections are opened lazily up to ``size``, checked for staleness on
+    checkout and reconnected if the server has dropped them. Each pooled
+    connection remembers which database it last ran ``USE`` against so the
+    manager's selected database follows every checkout.
+    """
+
+    def __init__(self, connect_args: Dict, size: int = 5, timeout: float = 30.0,
+                 health_check_interval: float = 60.0, backend=None):
+        self.connect_args = connect_args
+        self.backend = backend or MySQLBackend()
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._in_use = 0
+        self._stats = {'checkouts': 0, 'wait_total': 0.0, 'wait_max': 0.0,
+                       'timeouts': 0, 'reconnects': 0, 'peak_in_use': 0}
+
+    def _open(self) -> Dict:
+        connection = self.backend.connect(**self.connect_args)
+        return {'connection': connection, 'db_name': self.connect_args.get('database'),
+                'last_used': time.monotonic()}
+
+    def acquire(self) -> Dict:
+        """Check out a connection entry, waiting up to ``timeout`` seconds."""
+        start = time.perf_counter()
+        entry = None
+        try:
+            entry = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._opened < self.size
+                if grow:
+                    self._opened += 1
+            if grow:
+                try:
+                    entry = self._open()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                try:
+                    entry = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._stats['timeouts'] += 1
+                    raise mysql.connector.Error(
+                        msg=f"Timed out after {self.timeout}s waiting for a pooled connection")
+
+        if time.monotonic() - entry['last_used'] > self.health_check_interval:
+            self._check_health(entry)
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+            self._stats['wait_total'] += waited
+            self._stats['wait_max'] = max(self._stats['wait_max'], waited)
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._in_use)
+        return entry
+
+    def _check_health(self, entry: Dict):
+        """Ping an idle connection and reconnect it if the server dropped it."""
+        connection = entry['connection']
+        try:
+            connection.ping(reconnect=False)
+        except mysql.connector.Error:
+            try:
+                connection.reconnect(attempts=3, delay=1)
+            except mysql.connector.Error:
+                with self._lock:
+                    self._opened -= 1
+                raise
+            # A fresh session has no default database and no prepared statements
+            entry['db_name'] = None
+            entry['statements'] = None
+            with self._lock:
+                self._stats['reconnects'] += 1
+
+    def release(self, entry: Dict):
+        """Return a connection entry to the pool."""
+        entry['last_used'] = time.monotonic()
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(entry)
+
+    def stats(self) -> Dict:
+        """Return pool sizing metrics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({'size': self.size, 'opened': self._opened, 'in_use': self._in_use,
+                          'idle': self._idle.qsize()})
+        stats['wait_avg'] = stats['wait_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return stats
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                entry['connection'].close()
+            except mysql.connector.Error:
+                pass
+            with self._lock:
+                self._opened -= 1
+
+
+def parse_endpoint(endpoint, default_port: int = 3306) -> Dict:
+    """Turn 'host', 'host:port', a (host, port) pair or a dict of connect args into connect args."""
+    if isinstance(endpoint, dict):
+        return dict(endpoint)
+    if isinstance(endpoint, str):
+        host, _, port = endpoint.partition(':')
+        return {'host': host, 'port': int(port) if port else default_port}
+    host, port = endpoint
+    return {'host': host, 'port': int(port)}
+
+
+def _replication_lag(connection) -> Optional[float]:
+    """Seconds a server is behind its source: 0 if it isn't a replica, None if replication has stopped."""
+    cursor = connection.cursor()
+    try:
+        for statement in REPLICA_STATUS_STATEMENTS:
+            try:
+                cursor.execute(statement)
+                break
+            except mysql.connector.Error as err:
+                if err.errno != ER_PARSE_ERROR or statement == REPLICA_STATUS_STATEMENTS[-1]:
+                    raise
+        rows = cursor.fetchall()
+        if not rows:
+            return 0.0
+        columns = [column[0] for column in cursor.description]
+        index = next((columns.index(name) for name in REPLICA_LAG_COLUMNS if name in columns), None)
+        # Multi-source replicas report one row per channel; the slowest one counts
+        lags = [row[index] for row in rows] if index is not None else [None]
+        if any(lag is None for lag in lags):
+            return None
+        return float(max(lags))
+    finally:
+        cursor.close()
+
+
+class ReplicaSet:
+    """Read replicas of the primary, each with its own ConnectionPool.
+
+    pick() chooses the replica a read should use, in turn ('round_robin') or
+    by lowest probe round trip ('least_latency'), or returns None when none is
+    admitted and the read must go to the primary. After start(), a background
+    thread probes every replica for replication lag each ``check_interval``
+    seconds, so reads never wait on a probe. A replica is ejected when it is
+    more than ``max_lag`` seconds behind, when its replication has stopped or
+    when it can't be reached, and re-admitted once a later probe finds it
+    caught up. A server that isn't replicating at all counts as current.
+    """
+
+    def __init__(self, primary: str, endpoints: Iterable[Dict], strategy: str = 'round_robin',
+                 max_lag: float = 5.0, check_interval: float = 2.0, pool_size: int = 1,
+                 pool_timeout: float = 30.0, backend=None):
+        if strategy not in READ_STRATEGIES:
+            raise ValueError(f"strategy must be one of: {', '.join(READ_STRATEGIES)}")
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.backend = backend or MySQLBackend()
+        self.primary = {'name': primary, 'queries': 0}
+        self.counts = {'pinned_reads': 0, 'fallback_reads': 0}
+        self.replicas = []
+        for connect_args in endpoints:
+            # Autocommit, or a pooled connection keeps reading the snapshot its first SELECT opened
+            connect_args = dict(connect_args, autocommit=True)
+            connect_args.setdefault('connection_timeout', REPLICA_CONNECT_TIMEOUT)
+            self.replicas.append({
+                'name': f"{connect_args['host']}:{connect_args['port']}",
+                'connect_args': connect_args,
+                'pool': ConnectionPool(connect_args, size=pool_size, timeout=pool_timeout, backend=self.backend),
+                'probe': None, 'checked': None,
+                'admitted': False, 'lag': None, 'latency': None,
+                'queries': 0, 'errors': 0, 'ejections': 0,
+            })
+        self._lock = threading.Lock()
+        self._next = 0
+        self._stop = threading.Event()
+        self._monitor = None
+
+    def start(self):
+        """Probe every replica now, then keep probing them from a background thread."""
+        self.check()
+        self._monitor = threading.Thread(target=self._run_monitor, name="replica-monitor", daemon=True)
+        self._monitor.start()
+
+    def _run_monitor(self):
+        while not self._stop.wait(self.check_interval):
+            self.check()
+
+    def check(self):
+        """Probe every replica now."""
+        for replica in self.replicas:
+            self._probe(replica)
+
+    def pick(self) -> Optional[Dict]:
+        """Return the replica for the next read, or None to use the primary."""
+        with self._lock:
+            admitted = [replica for replica in self.replicas if replica['admitted']]
+            if not admitted:
+                return None
+            if self.strategy == 'least_latency':
+                return min(admitted, key=lambda replica: replica['latency'])
+            self._next += 1
+            return admitted[self._next % len(admitted)]
+
+    def _probe(self, replica: Dict):
+        """Measure a replica's lag over its own connection, then admit or eject it."""
+        start = time.perf_counter()
+        try:
+            if replica['probe'] is None:
+                replica['probe'] = self.backend.connect(**replica['connect_args'])
+            lag = _replication_lag(replica['probe'])
+        except mysql.connector.Error as err:
+            probe, replica['probe'] = replica['probe'], None
+            if probe is not None:
+                try:
+                    probe.close()
+                except mysql.connector.Error:
+                    pass
+            self.eject(replica, err)
+            return
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            first = replica['checked'] is None
+            replica['checked'] = time.monotonic()
+            replica['lag'] = lag
+            # Smoothed so one slow probe doesn't swing least-latency routing
+            previous = replica['latency']
+            replica['latency'] = elapsed if previous is None else 0.7 * previous + 0.3 * elapsed
+            admit = lag is not None and lag <= self.max_lag
+            changed = first or admit != replica['admitted']
+            if replica['admitted'] and not admit:
+                replica['ejections'] += 1
+            replica['admitted'] = admit
+        if not changed:
+            return
+        if admit:
+            print(f"Replica {replica['name']} admitted ({lag:.0f}s behind).")
+        elif lag is None:
+            print(f"Replica {replica['name']} ejected: replication is not running.")
+        else:
+            print(f"Replica {replica['name']} ejected: {lag:.0f}s behind (max {self.max_lag:g}s).")
+
+    def eject(self, replica: Dict, err: Exception):
+        """Take an unreachable replica out of rotation until a later probe succeeds."""
+        with self._lock:
+            changed = replica['admitted'] or replica['checked'] is None
+            replica['checked'] = time.monotonic()
+            replica['errors'] += 1
+            if replica['admitted']:
+                replica['ejections'] += 1
+            replica['admitted'] = False
+        # Idle connections to a failed server are likely dead too
+        replica['pool'].close()
+        if changed:
+            print(f"Replica {replica['name']} ejected: {err}")
+
+    def record(self, replica: Optional[Dict], read: bool = False, pinned: bool = False):
+        """Count one call served by ``replica``, or by the primary when it is None."""
+        with self._lock:
+            if replica is not None:
+                replica['queries'] += 1
+                return
+            self.primary['queries'] += 1
+            if read:
+                self.counts['pinned_reads' if pinned else 'fallback_reads'] += 1
+
+    def stats(self) -> Dict:
+        """Return routing counters and each endpoint's queries, lag and state."""
+        with self._lock:
+            endpoints = [{'endpoint': self.primary['name'], 'role': 'primary', 'admitted': True,
+                          'queries': self.primary['queries'], 'lag': 0.0, 'latency_ms': None,
+                          'errors': 0, 'ejections': 0}]
+            for replica in self.replicas:
+                latency = replica['latency']
+                endpoints.append({'endpoint': replica['name'], 'role': 'replica', 'admitted': replica['admitted'],
+                                  'queries': replica['queries'], 'lag': replica['lag'],
+                                  'latency_ms': latency * 1000 if latency is not None else None,
+                                  'errors': replica['errors'], 'ejections': replica['ejections']})
+            stats = dict(self.counts)
+        stats.update({'strategy': self.strategy, 'max_lag': self.max_lag, 'endpoints': endpoints})
+        return stats
+
+    def close(self):
+        """Stop probing and close every replica pool and probe connection."""
+        self._stop.set()
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+        for replica in self.replicas:
+            replica['pool'].close()
+            if replica['probe'] is not None:
+                try:
+                    replica['probe'].close()
+                except mysql.connector.Error:
+                    pass
+                replica['probe'] = None
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    """Return the pct-th percentile (0-100) of samples using nearest rank."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class AuthCache:
+    """Bounded LRU/TTL cache of recently verified credentials.
+
+    Entries are keyed on an HMAC of (username, password, stored hash) under a
+    per-process random key, so plaintext passwords are never kept and a
+    changed hash in the database never matches an old entry. A hit lets
+    authenticate skip bcrypt.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0, latency_samples: int = 10000):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._secret = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_samples)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, username: str, password: str, stored_hash: str) -> bytes:
+        message = "\0".join((username, password, stored_hash)).encode('utf-8')
+        return hmac.new(self._secret, message, hashlib.sha256).digest()
+
+    def get(self, key: bytes) -> bool:
+        """Return True if key was verified within the TTL."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False
+
+    def put(self, key: bytes, user_id: int, login_id: int):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (user_id, login_id, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int = None, login_id: int = None,
+                   user_ids: Iterable[int] = (), login_ids: Iterable[int] = ()):
+        """Drop every entry for the given user ID(s) and/or login ID(s)."""
+        user_ids = set(user_ids)
+        login_ids = set(login_ids)
+        if user_id is not None:
+            user_ids.add(user_id)
+        if login_id is not None:
+            login_ids.add(login_id)
+        with self._lock:
+            stale = [key for key, (entry_user, entry_login, _) in self._entries.items()
+                     if entry_user in user_ids or entry_login in login_ids]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def record_latency(self, seconds: float):
+        self._latencies.append(seconds)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = list(self._latencies)
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'p50_ms': _percentile(latencies, 50) * 1000,
+                'p99_ms': _percentile(latencies, 99) * 1000,
+            }
+
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BCRYPT_OPERATIONS = ('_encrypt_password', 'verify_password', 'hash_password')
+
+
+class Instrumentation:
+    """Per-operation latency histograms and statement accounting.
+
+    DatabaseManager methods decorated with @instrumented record their wall
+    time here, and the cursor/connection proxies handed out by _session add
+    round trips, rows, commits and time spent waiting on MySQL to every
+    operation running on the current thread. Operations slower than
+    ``slow_op_ms`` are written to ``slow_log_path`` (or stderr).
+    """
+
+    def __init__(self, enabled: bool = True, slow_op_ms: float = 500.0, slow_log_path: str = None):
+        self.enabled = enabled
+        self.slow_op_ms = slow_op_ms
+        self.slow_log_path = slow_log_path
+        self._ops = {}
+        self._db_time = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _frames(self) -> List[Dict]:
+        frames = getattr(self._local, 'frames', None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+    def begin(self) -> Dict:
+        frame = {'round_trips': 0, 'rows': 0, 'commits': 0, 'db_time': 0.0}
+        self._frames().append(frame)
+        return frame
+
+    def current(self) -> Optional[Dict]:
+        """Return this thread's innermost open frame, or None outside an @instrumented call."""
+        frames = self._frames()
+        return frames[-1] if frames else None
+
+    def add(self, db_time: float = 0.0, round_trips: int = 0, rows: int = 0, commits: int = 0):
+        """Credit database work to every operation in progress on this thread."""
+        for frame in self._frames():
+            frame['db_time'] += db_time
+            frame['round_trips'] += round_trips
+            frame['rows'] += rows
+            frame['commits'] += commits
+
+    def end(self, op: str, frame: Dict, elapsed: float, error: bool = False):
+        frames = self._frames()
+        # Frames nest strictly per thread; compare by identity (equal dicts are common)
+        for index in range(len(frames) - 1, -1, -1):
+            if frames[index] is frame:
+                del frames[index]
+                break
+        if not frames:
+            # Nested operations share db time, so total it from outermost calls only
+            with self._lock:
+                self._db_time += frame['db_time']
+        self.record(op, elapsed, error=error, **frame)
+
+    def record(self, op: str, elapsed: float, round_trips: int = 0, rows: int = 0,
+               commits: int = 0, db_time: float = 0.0, error: bool = False):
+        with self._lock:
+            stats = self._ops.get(op)
+            if stats is None:
+                stats = self._ops[op] = {'count': 0, 'errors': 0, 'total': 0.0, 'max': 0.0,
+                                         'db_time': 0.0, 'round_trips': 0, 'rows': 0, 'commits': 0,
+                                         'buckets': [0] * (len(LATENCY_BUCKETS) + 1)}
+            stats['count'] += 1
+            stats['errors'] += int(error)
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+            stats['db_time'] += db_time
+            stats['round_trips'] += round_trips
+            stats['rows'] += rows
+            stats['commits'] += commits
+            stats['buckets'][bisect.bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        if elapsed * 1000 >= self.slow_op_ms:
+            self._log_slow(op, elapsed, round_trips, rows)
+
+    def _log_slow(self, op: str, elapsed: float, round_trips: int, rows: int):
+        line = (f"{time.strftime('%Y-%m-%d %H:%M:%S')} SLOW {op} {elapsed * 1000:.1f} ms "
+                f"round_trips={round_trips} rows={rows}\n")
+        try:
+            if self.slow_log_path:
+                with open(self.slow_log_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            else:
+                sys.stderr.write(line)
+        except OSError:
+            pass
+
+    def reset(self):
+        with self._lock:
+            self._ops.clear()
+            self._db_time = 0.0
+
+    def _bucket_quantile(self, buckets: List[int], count: int, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket that contains it."""
+        target = q * count
+        seen = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS + (float('inf'),), buckets):
+            seen += bucket_count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def snapshot(self) -> Dict:
+        """Return per-operation stats plus bcrypt vs MySQL time totals."""
+        with self._lock:
+            ops = {op: dict(stats, buckets=list(stats['buckets'])) for op, stats in self._ops.items()}
+            mysql_ms = self._db_time * 1000
+        report = {}
+        for op, stats in sorted(ops.items()):
+            count = stats['count']
+            report[op] = {
+                'count': count,
+                'errors': stats['errors'],
+                'avg_ms': stats['total'] / count * 1000 if count else 0.0,
+                'max_ms': stats['max'] * 1000,
+                'p50_ms': self._bucket_quantile(stats['buckets'], count, 0.50) * 1000,
+                'p95_ms': self._bucket_quantile(stats['buckets'], count, 0.95) * 1000,
+                'p99_ms': self._bucket_quantile(stats['buckets'], count, 0.99) * 1000,
+                'total_ms': stats['total'] * 1000,
+                'db_ms': stats['db_time'] * 1000,
+                'round_trips': stats['round_trips'],
+                'rows': stats['rows'],
+                'commits': stats['commits'],
+                'buckets': stats['buckets'],
+            }
+        bcrypt_ms = sum(stats['total_ms'] for op, stats in report.items() if op in BCRYPT_OPERATIONS)
+        return {'operations': report, 'bcrypt_ms': bcrypt_ms, 'mysql_ms': mysql_ms}
+
+    def to_json(self, extra: Dict = None) -> str:
+        snapshot = self.snapshot()
+        for op in snapshot['operations'].values():
+            op.pop('buckets')
+        if extra:
+            snapshot.update(extra)
+        return json.dumps(snapshot, indent=2, default=str)
+
+    def to_prometheus(self, prefix: str = "mysecuredb") -> str:
+        """Render stats in the Prometheus text exposition format."""
+        with self._lock:
+            ops = {op: dict(stats, buckets=list(stats['buckets'])) for op, stats in self._ops.items()}
+        lines = [f"# TYPE {prefix}_operation_seconds histogram"]
+        for op, stats in sorted(ops.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + (float('inf'),), stats['buckets']):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f'{prefix}_operation_seconds_bucket{{op="{op}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_operation_seconds_sum{{op="{op}"}} {stats["total"]}')
+            lines.append(f'{prefix}_operation_seconds_count{{op="{op}"}} {stats["count"]}')
+        for metric, key in (('operation_errors_total', 'errors'), ('round_trips_total', 'round_trips'),
+                            ('rows_total', 'rows'), ('commits_total', 'commits'),
+                            ('db_seconds_total', 'db_time')):
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for op, stats in sorted(ops.items()):
+                lines.append(f'{prefix}_{metric}{{op="{op}"}} {stats[key]}')
+        return "\n".join(lines) + "\n"
+
+
+def instrumented(method):
+    """Record a DatabaseManager method's latency and database work under its name."""
+    op = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        instrumentation = self.instrumentation
+        if not instrumentation.enabled:
+            return method(self, *args, **kwargs)
+        frame = instrumentation.begin()
+        start = time.perf_counter()
+        error = False
+        try:
+            return method(self, *args, **kwargs)
+        except BaseException:
+            error = True
+            raise
+        finally:
+            instrumentation.end(op, frame, time.perf_counter() - start, error)
+    return wrapper
+
+
+def _is_connection_error(err: Exception) -> bool:
+    """Return True if ``err`` means the server or the connection failed, not the statement."""
+    if getattr(err, 'errno', None) in CONNECTION_ERRNOS:
+        return True
+    return isinstance(err, (mysql.connector.InterfaceError, mysql.connector.OperationalError))
+
+
+class _ReplicaFailed(Exception):
+    """Raised out of a replica session so a replica_read method skips its own error report."""
+
+
+def replica_read(method):
+    """Re-run a read-only DatabaseManager method on the primary if its replica failed.
+
+    The method's session is opened with ``_session(read=True)``. When the
+    replica's connection fails, _session ejects it and raises _ReplicaFailed,
+    which the method doesn't catch, so nothing is reported unless the retry
+    on the primary fails too.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.replicas is None or getattr(self._local, 'session', None) is not None:
+            return method(self, *args, **kwargs)
+        outer = getattr(self._local, 'replica_attempt', False)
+        self._local.replica_attempt = True
+        try:
+            return method(self, *args, **kwargs)
+        except _ReplicaFailed:
+            pass
+        finally:
+            self._local.replica_attempt = outer
+        self._local.primary_retry = True
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._local.primary_retry = False
+    return wrapper
+
+
+class _InstrumentedCursor:
+    """Cursor proxy that reports round trips, rows and MySQL time to Instrumentation."""
+
+    def __init__(self, cursor, instrumentation: Instrumentation):
+        self._cursor = cursor
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._instrumentation.add(rows=1)
+            yield row
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            # Result sets are counted as they are fetched; DML counts affected rows
+            rows = 0 if getattr(self._cursor, 'with_rows', False) else max(self._cursor.rowcount, 0)
+            self._instrumentation.add(time.perf_counter() - start, round_trips=1, rows=rows)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            # mysql.connector folds INSERT batches into one multi-row statement
+            batched = operation.lstrip().upper().startswith('INSERT')
+            round_trips = 1 if batched else len(seq_params)
+            self._instrumentation.add(time.perf_counter() - start, round_trips=round_trips,
+                                      rows=max(self._cursor.rowcount, 0))
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        if result is None:
+            rows = 0
+        elif isinstance(result, list):
+            rows = len(result)
+        else:
+            rows = 1
+        self._instrumentation.add(time.perf_counter() - start, rows=rows)
+        return result
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, size=1):
+        return self._fetch(self._cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+
+class _InstrumentedConnection:
+    """Connection proxy that counts and times commits."""
+
+    def __init__(self, connection, instrumentation: Instrumentation):
+        self._connection = connection
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        return _InstrumentedCursor(self._connection.cursor(*args, **kwargs), self._instrumentation)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return self._connection.commit()
+        finally:
+            self._instrumentation.add(time.perf_counter() - start, round_trips=1, commits=1)
+
+
+class RecordCache:
+    """Bounded in-process LRU/TTL cache for user and login lookups.
+
+    Values are stored under string keys ('user:5', 'login:alice') together with
+    tags ('user:5', 'login_id:7') so that one write can invalidate every entry
+    that depends on a row. A stored value of None is a negative entry (the row
+    doesn't exist) and expires after ``negative_ttl``.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0, negative_ttl: float = 5.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _sizeof(value) -> int:
+        if isinstance(value, dict):
+            return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value.values())
+        return sys.getsizeof(value)
+
+    def get(self, key: str) -> Tuple[bool, Optional[Dict]]:
+        """Return (hit, value); value is None for a cached "not found"."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[0]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return False, None
+
+    def put(self, key: str, value: Optional[Dict], tags: Iterable[str] = ()):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            ttl = self.ttl if value is not None else self.negative_ttl
+            tags = tuple(tags)
+            self._entries[key] = (value, time.monotonic() + ttl, tags)
+            self._bytes += self._sizeof(value)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        value, _, tags = self._entries.pop(key)
+        self._bytes -= self._sizeof(value)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, keys: Iterable[str] = (), tags: Iterable[str] = ()):
+        """Drop the given keys and every entry carrying one of the tags."""
+        with self._lock:
+            stale = set(keys)
+            for tag in tags:
+                stale.update(self._tags.get(tag, ()))
+            for key in stale:
+                if key in self._entries:
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'memory',
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'memory_bytes': self._bytes + sys.getsizeof(self._entries),
+            }
+
+
+class SharedRecordCache(RecordCache):
+    """RecordCache stored in a local SQLite file so several worker processes share it.
+
+    Writes and invalidations from any process are seen by all of them. Hit,
+    miss and eviction counters are per process.
+    """
+
+    def __init__(self, path: str, max_size: int = 100000, ttl: float = 60.0, negative_ttl: float = 5.0):
+        super().__init__(max_size, ttl, negative_ttl)
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS cache_tags (tag TEXT, key TEXT)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_cache_tags_tag ON cache_tags (tag)")
+        self._puts = 0
+
+    def get(self, key: str) -> Tuple[bool, Optional[Dict]]:
+        # Wall-clock time: expiry must mean the same thing in every process
+        with self._lock:
+            row = self._db.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] > time.time():
+                self.hits += 1
+                return True, json.loads(row[0])
+            self.misses += 1
+            return False, None
+
+    def put(self, key: str, value: Optional[Dict], tags: Iterable[str] = ()):
+        ttl = self.ttl if value is not None else self.negative_ttl
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                                 (key, json.dumps(value, default=str), time.time() + ttl))
+                self._db.execute("DELETE FROM cache_tags WHERE key = ?", (key,))
+                self._db.executemany("INSERT INTO cache_tags (tag, key) VALUES (?, ?)", [(tag, key) for tag in tags])
+                self._puts += 1
+                if self._puts % 100 == 0:
+                    self._evict()
+                self._db.execute("COMMIT")
+            except sqlite3.Error:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _evict(self):
+        """Drop expired entries, then the soonest-to-expire ones beyond max_size."""
+        self._db.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        excess = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_size
+        if excess > 0:
+            self._db.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires LIMIT ?)",
+                             (excess,))
+            self.evictions += excess
+        self._db.execute("DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache)")
+
+    def invalidate(self, keys: Iterable[str] = (), tags: Iterable[str] = ()):
+        keys = list(keys)
+        tags = list(tags)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            for tag in tags:
+                keys.extend(row[0] for row in self._db.execute("SELECT key FROM cache_tags WHERE tag = ?", (tag,)))
+            self._db.executemany("DELETE FROM cache WHERE key = ?", [(key,) for key in keys])
+            self._db.executemany("DELETE FROM cache_tags WHERE key = ?", [(key,) for key in keys])
+            self._db.execute("COMMIT")
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM cache")
+            self._db.execute("DELETE FROM cache_tags")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'sqlite',
+                'path': self.path,
+                'size': size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'memory_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            }
+
+
+class _CommitHookConnection:
+    """Connection proxy that calls ``on_commit`` after every successful commit."""
+
+    def __init__(self, connection, on_commit: Callable):
+        self._connection = connection
+        self._on_commit = on_commit
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def commit(self):
+        self._connection.commit()
+        self._on_commit()
+
+
+class _DeferredCommitConnection:
+    """Connection proxy used inside DatabaseManager.transaction().
+
+    commit() is a no-op and rollback() only marks the transaction as failed;
+    the real commit or rollback happens once when the block exits. Manager
+    methods report errors by return value, so failed statements are recorded
+    in ``error`` by _TransactionCursor as well.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.error = None
+        # Savepoint name -> error state when it was set, restored by ROLLBACK TO
+        self.savepoints = {}
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        if self.error is None:
+            self.error = mysql.connector.Error(msg="rolled back by a call inside the transaction")
+
+
+class _TransactionCursor:
+    """Cursor proxy used inside DatabaseManager.transaction() to record failed statements."""
+
+    def __init__(self, cursor, transaction: _DeferredCommitConnection):
+        self._cursor = cursor
+        self._transaction = transaction
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        try:
+            result = self._cursor.execute(operation, params, *args, **kwargs)
+        except mysql.connector.Error as err:
+            self._transaction.error = err
+            raise
+        words = operation.split()
+        if words[:1] == ['SAVEPOINT']:
+            self._transaction.savepoints[words[1]] = self._transaction.error
+        elif words[:3] == ['ROLLBACK', 'TO', 'SAVEPOINT']:
+            # Work after the savepoint is undone, and so are its failures
+            self._transaction.error = self._transaction.savepoints.get(words[3])
+        return result
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        except mysql.connector.Error as err:
+            self._transaction.error = err
+            raise
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+
+class StatementCache:
+    """Per-connection LRU of server-side prepared statements.
+
+    mysql.connector's prepared cursor only keeps the statement it last ran, so
+    each distinct SQL text gets its own ``cursor(prepared=True)`` here and is
+    re-executed with new parameters instead of being parsed again. Counters
+    are shared by every connection of a manager and guarded by ``lock``.
+    """
+
+    def __init__(self, connection, max_size: int, counts: Dict, lock: threading.Lock):
+        self.connection = connection
+        self.max_size = max_size
+        self._counts = counts
+        self._lock = lock
+        self._cursors = OrderedDict()
+
+    def cursor_for(self, operation: str, executions: int = 1):
+        """Return the prepared cursor for ``operation``, preparing it on first use."""
+        cursor = self._cursors.get(operation)
+        with self._lock:
+            self._counts['executes'] += executions
+            if cursor is None:
+                self._counts['prepares'] += 1
+        if cursor is not None:
+            self._cursors.move_to_end(operation)
+            return cursor
+        cursor = self.connection.cursor(prepared=True)
+        self._cursors[operation] = cursor
+        if len(self._cursors) > self.max_size:
+            _, evicted = self._cursors.popitem(last=False)
+            # Closing a prepared cursor deallocates its statement on the server
+            try:
+                evicted.close()
+            except mysql.connector.Error:
+                pass
+            with self._lock:
+                self._counts['evictions'] += 1
+        return cursor
+
+    def close(self):
+        """Deallocate every cached statement."""
+        while self._cursors:
+            _, cursor = self._cursors.popitem()
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._cursors)
+
+
+class _PreparedCursor:
+    """Cursor proxy that runs parameterised statements through a StatementCache.
+
+    Statements without parameters (DDL, USE, SHOW) and batched INSERTs, which
+    mysql.connector folds into one multi-row statement, stay on the plain
+    cursor. Fetches and attributes follow whichever cursor ran last.
+    """
+
+    def __init__(self, cursor, statements: StatementCache):
+        self._cursor = cursor
+        self._statements = statements
+        self._active = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._active, name)
+
+    def __iter__(self):
+        return iter(self._active)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._active = self._statements.cursor_for(operation) if params else self._cursor
+        return self._active.execute(operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        if operation.lstrip().upper().startswith('INSERT'):
+            self._active = self._cursor
+        else:
+            self._active = self._statements.cursor_for(operation, len(seq_params))
+        return self._active.executemany(operation, seq_params, *args, **kwargs)
+
+    def fetchone(self):
+        return self._active.fetchone()
+
+    def fetchmany(self, size=1):
+        return self._active.fetchmany(size)
+
+    def fetchall(self):
+        return self._active.fetchall()
+
+
+def _qualified(database: str, table: str) -> str:
+    """Return a backtick-quoted ``database``.``table`` name."""
+    return ".".join("`" + name.replace("`", "``") + "`" for name in (database, table))
+
+
+def tenant_schema_version(cursor, database: str) -> int:
+    """Fan-out operation: the tenant's applied schema version (0 if unversioned)."""
+    try:
+        cursor.execute(f"SELECT MAX(version) FROM {_qualified(database, 'schema_version')}")
+    except mysql.connector.Error as err:
+        if getattr(err, 'errno', None) == ER_NO_SUCH_TABLE:
+            return 0
+        raise
+    return cursor.fetchone()[0] or 0
+
+
+def tenant_user_count(cursor, database: str) -> int:
+    """Fan-out operation: number of users in the tenant."""
+    cursor.execute(f"SELECT COUNT(*) FROM {_qualified(database, 'User')}")
+    return cursor.fetchone()[0]
+
+
+def tenant_password_audit(cursor, database: str, min_cost: int = 12) -> Dict:
+    """Fan-out operation: count logins whose bcrypt cost is below ``min_cost``.
+
+    The cost is read from the hash prefix ($2b$12$...), so no bcrypt work is done.
+    """
+    cursor.execute(
+        f"SELECT COUNT(*), COALESCE(SUM(CAST(SUBSTRING(password, 5, 2) AS UNSIGNED) < %s), 0) "
+        f"FROM {_qualified(database, 'Login')}",
+        (min_cost,)
+    )
+    logins, weak = cursor.fetchone()
+    return {'logins': logins, 'below_min_cost': int(weak)}
+
+
+TENANT_OPERATIONS = {
+    'schema_version': tenant_schema_version,
+    'count_users': tenant_user_count,
+    'password_audit': tenant_password_audit,
+}
+
+
+class DatabaseManager:
+    def __init__(self, pool_size: int = 0, pool_timeout: float = 30.0,
+                 auth_cache_size: int = 10000, auth_cache_ttl: float = 300.0,
+                 bcrypt_rounds: Optional[int] = None, instrument: bool = True,
+                 slow_op_ms: float = 500.0, slow_log_path: str = None,
+                 user_cache_size: int = 0, user_cache_ttl: float = 60.0,
+                 negative_cache_ttl: float = 5.0, shared_cache_path: str = None,
+                 row_format: str = 'dict', prepared_statements: bool = True,
+                 statement_cache_size: int = 64, backend=None, replicas: Iterable = None,
+                 read_strategy: str = 'round_robin', max_replica_lag: float = 5.0,
+                 replica_check_interval: float = 2.0, read_your_writes: Optional[float] = None):
+        if row_format not in ('dict', 'record'):
+            raise ValueError("row_format must be 'dict' or 'record'")
+        if read_strategy not in READ_STRATEGIES:
+            raise ValueError(f"read_strategy must be one of: {', '.join(READ_STRATEGIES)}")
+        if replicas and isinstance(backend, SQLiteBackend):
+            raise ValueError("replicas need a MySQL backend")
         self.connection = None
         self.cursor = None
         self.db_name = None
+        # Where the data lives: MySQLBackend (default) or an embedded SQLiteBackend
+        self.backend = backend or MySQLBackend()
+        # pool_size > 0 switches to pooled mode: each call checks out its own connection
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.pool = None
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        # Set auth_cache_size to 0 to always run bcrypt in authenticate
+        self.auth_cache = AuthCache(auth_cache_size, auth_cache_ttl)
+        # bcrypt cost for new hashes (None = library default); see calibrate_bcrypt_cost
+        self.bcrypt_rounds = bcrypt_rounds
+        self.instrumentation = Instrumentation(instrument, slow_op_ms, slow_log_path)
+        # Optional read-through cache for select_user_by_id / select_login_by_username.
+        # shared_cache_path puts it in a SQLite file shared by worker processes.
+        if shared_cache_path:
+            self.user_cache = SharedRecordCache(shared_cache_path, user_cache_size or 100000,
+                                                user_cache_ttl, negative_cache_ttl)
+        elif user_cache_size > 0:
+            self.user_cache = RecordCache(user_cache_size, user_cache_ttl, negative_cache_ttl)
+        else:
+            self.user_cache = None
+        # 'dict' keeps the original per-row dicts; 'record' returns UserRecord/LoginRecord tuples
+        self.row_format = row_format
+        # Parameterised statements run as server-side prepared statements, cached per connection
+        self.prepared_statements = prepared_statements
+        self.statement_cache_size = statement_cache_size
+        self._statements = None
+        self._statement_counts = {'prepares': 0, 'executes': 0, 'evictions': 0}
+        self._statement_lock = threading.Lock()
+        # Discovery results cached for the manager's lifetime. schema_versions maps
+        # database name -> known applied version; callers may pre-seed it (the CLI
+        # does, from the settings file) so migrate() can skip even its version check.
+        self._databases = None
+        self.schema_versions = {}
+        self._connect_args = None
+        # Read replicas ('host:port', (host, port) or connect-arg dicts sharing the
+        # primary's credentials). Lookups go to an admitted replica; a thread that
+        # commits keeps reading from the primary for ``read_your_writes`` seconds,
+        # by default long enough for any replica still in rotation to catch up.
+        self.replica_endpoints = [parse_endpoint(endpoint) for endpoint in replicas or ()]
+        self.read_strategy = read_strategy
+        self.max_replica_lag = max_replica_lag
+        self.replica_check_interval = replica_check_interval
+        if read_your_writes is None:
+            read_your_writes = max_replica_lag + replica_check_interval
+        self.read_your_writes = read_your_writes
+        self.replicas = None
     
-    def connect_to_mysql(self, password: str) -> bool:
-        """Connect to MySQL server with root user and provided password."""
+    def connect_to_mysql(self, password: str, host: str = "localhost", user: str = "root",
+                         port: int = 3306, database: str = None) -> bool:
+        """Connect to MySQL server with root user and provided password.
+
+        Passing ``database`` selects it as part of the handshake, saving the
+        separate USE round trip of select_database(). With a SQLiteBackend the
+        credentials are ignored and the backend's file is opened instead.
+        """
         try:
-            self.connection = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password=password
-            )
-            self.cursor = self.connection.cursor()
-            print("Connected to MySQL server successfully!")
-            return True
+            # consume_results lets a cached statement run again after a partial fetch
+            connect_args = {'host': host, 'user': user, 'password': password, 'port': port,
+                            'consume_results': True}
+            # Kept (without a default database) for fan_out()'s own connections
+            self._connect_args = dict(connect_args)
+            if database:
+                connect_args['database'] = database
+                self.db_name = database
+            if self.pool_size > 0:
+                self.pool = ConnectionPool(connect_args, size=self.pool_size, timeout=self.pool_timeout,
+                                           backend=self.backend)
+                # Open the first connection now so a bad password fails here
+                self.pool.release(self.pool.acquire())
+                print(f"Connected to {self.backend.label} successfully! (pool of {self.pool_size})")
+            else:
+                self.connection = self.backend.connect(**connect_args)
+                self.cursor = self.connection.cursor()
+                self._statements = self._statement_cache(self.connection)
+                print(f"Connected to {self.backend.label} successfully!")
         except mysql.connector.Error as err:
             print(f"Error connecting to MySQL server: {err}")
             return False
+        if self.replica_endpoints:
+            # An unreachable replica is only ejected; reads fall back to the primary
+            endpoints = [dict(connect_args, **endpoint) for endpoint in self.replica_endpoints]
+            self.replicas = ReplicaSet(f"{host}:{port}", endpoints, self.read_strategy, self.max_replica_lag,
+                                       self.replica_check_interval, max(self.pool_size, 1), self.pool_timeout,
+                                       self.backend)
+            self.replicas.start()
+            admitted = sum(1 for replica in self.replicas.replicas if replica['admitted'])
+            print(f"Routing reads to {admitted} of {len(endpoints)} replica(s) ({self.read_strategy}).")
+        return True
     
-    def get_all_databases(self) -> List[str]:
-        """Get a list of all databases on the MySQL server."""
+    @contextmanager
+    def _session(self, read: bool = False):
+        """Yield a (connection, cursor) pair for one call.
+
+        Without a pool this is the shared connection, serialised by a lock. With
+        a pool a connection is checked out, switched to ``self.db_name`` if
+        needed, and returned afterwards. Nested calls on the same thread reuse
+        the outer session. With replicas, ``read=True`` sessions run on a
+        replica unless this thread has just committed a write.
+        """
+        current = getattr(self._local, 'session', None)
+        if current is not None:
+            yield current
+            return
+
+        if self.replicas is not None:
+            pinned = read and getattr(self._local, 'pinned_until', 0.0) > time.monotonic()
+            retry = getattr(self._local, 'primary_retry', False)
+            replica = self.replicas.pick() if read and not (pinned or retry) else None
+            if replica is not None:
+                try:
+                    entry = replica['pool'].acquire()
+                except mysql.connector.Error as err:
+                    # A pool timeout means busy, not down; either way this read uses the primary
+                    if _is_connection_error(err):
+                        self.replicas.eject(replica, err)
+                else:
+                    self.replicas.record(replica)
+                    try:
+                        with self._pooled_session(replica['pool'], entry, primary=False) as session:
+                            yield session
+                    except mysql.connector.Error as err:
+                        # A statement error would fail on the primary just the same
+                        if not _is_connection_error(err):
+                            raise
+                        self.replicas.eject(replica, err)
+                        if getattr(self._local, 'replica_attempt', False):
+                            # replica_read retries the call on the primary
+                            raise _ReplicaFailed() from err
+                        raise
+                    return
+            self.replicas.record(None, read, pinned)
+
+        if self.pool is None:
+            with self._lock:
+                self._local.session = self._instrument_session(
+                    self._primary_connection(self.connection),
+                    self._prepared_cursor(self.cursor, self._statements))
+                try:
+                    yield self._local.session
+                finally:
+                    self._local.session = None
+                    self._end_snapshot(self.connection)
+            return
+
+        with self._pooled_session(self.pool, self.pool.acquire()) as session:
+            yield session
+    
+    @contextmanager
+    def _pooled_session(self, pool: ConnectionPool, entry: Dict, primary: bool = True):
+        """Run one session on a checked-out pool entry and return it afterwards."""
+        connection = entry['connection']
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            if self.db_name and entry['db_name'] != self.db_name:
+                cursor.execute(f"USE {self.db_name}")
+                entry['db_name'] = self.db_name
+                # Prepared statements keep the database that was current at PREPARE
+                if entry.get('statements') is not None:
+                    entry['statements'].close()
+                    entry['statements'] = None
+            if entry.get('statements') is None:
+                entry['statements'] = self._statement_cache(connection)
+            if primary:
+                connection = self._primary_connection(connection)
+            self._local.on_replica = not primary
+            self._local.session = self._instrument_session(
+                connection, self._prepared_cursor(cursor, entry['statements']))
+            yield self._local.session
+        except BaseException:
+            # Don't hand a connection with a half-finished transaction to the next caller
+            try:
+                entry['connection'].rollback()
+            except mysql.connector.Error:
+                pass
+            raise
+        finally:
+            self._local.session = None
+            self._local.on_replica = False
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except mysql.connector.Error:
+                    pass
+            self._end_snapshot(entry['connection'])
+            pool.release(entry)
+    
+    def _reset_statements(self):
+        """Drop the shared connection's prepared statements after a USE.
+
+        A server-side statement keeps running in the database that was current
+        when it was prepared. Pooled entries are reset in _pooled_session, the
+        next time they are switched to ``self.db_name``.
+        """
+        if self._statements is not None:
+            self._statements.close()
+            self._statements = self._statement_cache(self.connection)
+    
+    @staticmethod
+    def _end_snapshot(connection):
+        """Roll back the transaction a read-only call leaves open.
+
+        Without autocommit a SELECT starts a REPEATABLE READ snapshot that
+        outlives the call, so the next caller on this connection wouldn't see
+        rows committed since on other connections. Writes have committed by now.
+        """
+        if getattr(connection, 'in_transaction', False):
+            try:
+                connection.rollback()
+            except mysql.connector.Error:
+                pass
+    
+    def _primary_connection(self, connection):
+        """With replicas, wrap a primary connection so its commits pin this thread's reads."""
+        if self.replicas is None or self.read_your_writes <= 0:
+            return connection
+        return _CommitHookConnection(connection, self._pin_reads)
+    
+    def _pin_reads(self):
+        self._local.pinned_until = time.monotonic() + self.read_your_writes
+    
+    @contextmanager
+    def transaction(self):
+        """Run several manager calls as one transaction.
+
+        Inside the block every method shares one connection and their
+        individual commits are deferred; the work is committed once on exit,
+        or rolled back if the block raises. Methods still report their own
+        errors by return value, but any failed statement inside the block
+        rolls the whole transaction back and the error is raised on exit.
+        Wrap calls whose failure should not abort the rest in savepoint().
+        """
+        if getattr(self._local, 'transaction', None) is not None:
+            # Already inside a transaction: join it
+            yield self
+            return
+        with self._session() as (connection, cursor):
+            transaction = _DeferredCommitConnection(connection)
+            self._local.session = (transaction, _TransactionCursor(cursor, transaction))
+            self._local.transaction = transaction
+            try:
+                yield self
+                if transaction.error is not None:
+                    raise transaction.error
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+            finally:
+                self._local.transaction = None
+                self._local.session = (connection, cursor)
+    
+    @contextmanager
+    def savepoint(self, name: str = "unit_of_work"):
+        """Inside transaction(): undo only this block's work if a call in it fails.
+
+        The rest of the transaction carries on; the error is raised after
+        rolling back to the savepoint.
+        """
+        transaction = getattr(self._local, 'transaction', None)
+        if transaction is None:
+            raise RuntimeError("savepoint() must be used inside transaction()")
+        _, cursor = self._local.session
+        cursor.execute(f"SAVEPOINT {name}")
         try:
-            self.cursor.execute("SHOW DATABASES")
-            # Extract database names from results, excluding system databases
-            databases = [db[0] for db in self.cursor if db[0] not in ['information_schema', 'mysql', 'performance_schema', 'sys']]
-            return databases
+            yield self
+        except BaseException:
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+            raise
+        error = transaction.error
+        if error is not transaction.savepoints.get(name):
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+            raise error
+    
+    def _statement_cache(self, connection) -> Optional[StatementCache]:
+        if not (self.prepared_statements and self.backend.supports_prepared):
+            return None
+        return StatementCache(connection, self.statement_cache_size, self._statement_counts,
+                              self._statement_lock)
+    
+    def _prepared_cursor(self, cursor, statements: Optional[StatementCache]):
+        return cursor if statements is None else _PreparedCursor(cursor, statements)
+    
+    def statement_stats(self) -> Dict:
+        """Return prepared-statement counts: prepares, executes, evictions and the reuse ratio."""
+        with self._statement_lock:
+            stats = dict(self._statement_counts)
+        stats['enabled'] = self.prepared_statements and self.backend.supports_prepared
+        stats['reuse_ratio'] = 1 - stats['prepares'] / stats['executes'] if stats['executes'] else 0.0
+        return stats
+    
+    def _instrument_session(self, connection, cursor) -> Tuple:
+        if not self.instrumentation.enabled:
+            return connection, cursor
+        return (_InstrumentedConnection(connection, self.instrumentation),
+                _InstrumentedCursor(cursor, self.instrumentation))
+    
+    def pool_stats(self) -> Dict:
+        """Return connection pool metrics (empty when not pooled)."""
+        return self.pool.stats() if self.pool else {}
+    
+    def routing_stats(self) -> Dict:
+        """Return per-endpoint query counts and replica lag and health (empty without replicas)."""
+        return self.replicas.stats() if self.replicas is not None else {}
+    
+    def _user_row(self, row: Tuple) -> UserRow:
+        """Convert a (userId, firstName, lastName, email, accessLevel) tuple to the configured row type."""
+        if self.row_format == 'record':
+            return UserRecord._make(row)
+        return dict(zip(USER_COLUMNS, row))
+    
+    def _cache_get(self, key: str) -> Tuple[bool, Optional[Dict]]:
+        if self.user_cache is None:
+            return False, None
+        return self.user_cache.get(key)
+    
+    def _cache_put(self, key: str, value: Optional[Dict], tags: Iterable[str] = ()):
+        # Values read inside a transaction may still be rolled back, and a lagging
+        # replica can return a row the primary has just changed, so cache neither
+        if (self.user_cache is not None and getattr(self._local, 'transaction', None) is None
+                and not getattr(self._local, 'on_replica', False)):
+            self.user_cache.put(key, value, tags)
+    
+    def _invalidate(self, user_ids: Iterable[int] = (), login_ids: Iterable[int] = (),
+                    keys: Iterable[str] = ()):
+        """Drop auth cache and user cache entries for rows that were just written."""
+        user_ids = list(user_ids)
+        login_ids = list(login_ids)
+        self.auth_cache.invalidate(user_ids=user_ids, login_ids=login_ids)
+        if self.user_cache is not None:
+            tags = [f"user:{user_id}" for user_id in user_ids] + [f"login_id:{login_id}" for login_id in login_ids]
+            self.user_cache.invalidate(keys, tags)
+    
+    def cache_stats(self) -> Dict:
+        """Return user cache hit ratio, evictions and memory footprint (empty when disabled)."""
+        return self.user_cache.stats() if self.user_cache is not None else {}
+    
+    def performance_stats(self) -> Dict:
+        """Return per-operation latency/round-trip stats plus pool and cache stats."""
+        stats = self.instrumentation.snapshot()
+        stats['pool'] = self.pool_stats()
+        stats['auth_cache'] = self.auth_stats()
+        stats['user_cache'] = self.cache_stats()
+        stats['statements'] = self.statement_stats()
+        stats['routing'] = self.routing_stats()
+        return stats
+    
+    def export_stats(self, fmt: str = 'json') -> str:
+        """Export live stats as 'json' or 'prometheus' text."""
+        if fmt == 'prometheus':
+            lines = [self.instrumentation.to_prometheus().rstrip("\n")]
+            statements = self.statement_stats()
+            for key in ('prepares', 'executes', 'evictions'):
+                lines.append(f"# TYPE mysecuredb_statement_{key}_total counter")
+                lines.append(f"mysecuredb_statement_{key}_total {statements[key]}")
+            endpoints = self.routing_stats().get('endpoints', [])
+            if endpoints:
+                lines.append("# TYPE mysecuredb_endpoint_queries_total counter")
+                for endpoint in endpoints:
+                    lines.append(f'mysecuredb_endpoint_queries_total{{endpoint="{endpoint["endpoint"]}",'
+                                 f'role="{endpoint["role"]}"}} {endpoint["queries"]}')
+                lines.append("# TYPE mysecuredb_replica_lag_seconds gauge")
+                for endpoint in endpoints[1:]:
+                    if endpoint['lag'] is not None:
+                        lines.append(f'mysecuredb_replica_lag_seconds{{endpoint="{endpoint["endpoint"]}"}} '
+                                     f'{endpoint["lag"]}')
+                lines.append("# TYPE mysecuredb_replica_admitted gauge")
+                for endpoint in endpoints[1:]:
+                    lines.append(f'mysecuredb_replica_admitted{{endpoint="{endpoint["endpoint"]}"}} '
+                                 f'{int(endpoint["admitted"])}')
+            return "\n".join(lines) + "\n"
+        return self.instrumentation.to_json({'pool': self.pool_stats(), 'auth_cache': self.auth_stats(),
+                                             'user_cache': self.cache_stats(),
+                                             'statements': self.statement_stats(),
+                                             'routing': self.routing_stats()})
+    
+    @instrumented
+    def get_all_databases(self, refresh: bool = False) -> List[str]:
+        """Get a list of all databases on the MySQL server (cached until refresh or create_database)."""
+        if self._databases is not None and not refresh:
+            return list(self._databases)
+        try:
+            with self._session() as (connection, cursor):
+                cursor.execute("SHOW DATABASES")
+                # Extract database names from results, excluding system databases
+                databases = [db[0] for db in cursor if db[0] not in ['information_schema', 'mysql', 'performance_schema', 'sys']]
+                self._databases = databases
+                return list(databases)
         except mysql.connector.Error as err:
             print(f"Error retrieving databases: {err}")
             return []
     
+    def fan_out(self, operation: Union[str, Callable], databases: Iterable[str] = None,
+                match: str = None, workers: int = 8, **op_kwargs) -> Iterator[Dict]:
+        """Run ``operation`` against many tenant databases concurrently.
+
+        ``operation`` is a TENANT_OPERATIONS name or a callable
+        ``op(cursor, database, **op_kwargs)`` that addresses tables through
+        _qualified(database, table); nothing runs USE, so the selected database
+        is untouched. Tenants are ``databases`` or every database on the
+        server, optionally filtered by the ``match`` glob. ``workers`` threads
+        each use their own connection. One record per tenant is yielded as it
+        finishes: database, ok, result, error and ms.
+        """
+        if isinstance(operation, str):
+            if operation not in TENANT_OPERATIONS:
+                raise ValueError(f"Unknown tenant operation: {operation}")
+            operation = TENANT_OPERATIONS[operation]
+        if self._connect_args is None:
+            raise RuntimeError("connect_to_mysql() must be called before fan_out()")
+        tenants = list(databases) if databases is not None else self.get_all_databases()
+        if match:
+            tenants = [name for name in tenants if fnmatch.fnmatchcase(name, match)]
+        if not tenants:
+            return
+
+        pool = ConnectionPool(self._connect_args, size=max(1, min(workers, len(tenants))),
+                              timeout=self.pool_timeout, backend=self.backend)
+        executor = futures.ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="tenant")
+        try:
+            jobs = [executor.submit(self._run_tenant, pool, operation, name, op_kwargs) for name in tenants]
+            for job in futures.as_completed(jobs):
+                yield job.result()
+        finally:
+            # Stops pending tenants too if the caller abandons the stream early
+            executor.shutdown(wait=True, cancel_futures=True)
+            pool.close()
+    
+    def _run_tenant(self, pool: ConnectionPool, operation: Callable, database: str, op_kwargs: Dict) -> Dict:
+        record = {'database': database, 'ok': False, 'result': None, 'error': None}
+        start = time.perf_counter()
+        try:
+            entry = pool.acquire()
+            connection = entry['connection']
+            try:
+                cursor = connection.cursor()
+                try:
+                    record['result'] = operation(cursor, database, **op_kwargs)
+                finally:
+                    cursor.close()
+                connection.commit()
+                record['ok'] = True
+            except Exception:
+                try:
+                    connection.rollback()
+                except mysql.connector.Error:
+                    pass
+                raise
+            finally:
+                pool.release(entry)
+        except Exception as err:
+            # One broken tenant must not stop the sweep
+            record['error'] = f"{type(err).__name__}: {err}"
+        record['ms'] = (time.perf_counter() - start) * 1000
+        return record
+    
+    @instrumented
     def select_database(self, db_name: str) -> bool:
         """Select an existing database."""
         try:
+            # Switch only once USE succeeds, so pooled sessions never USE a missing database
+            with self._session() as (connection, cursor):
+                cursor.execute(f"USE {db_name}")
+                self._reset_statements()
             self.db_name = db_name
-            self.cursor.execute(f"USE {self.db_name}")
             print(f"Database '{self.db_name}' selected successfully!")
             return True
         except mysql.connector.Error as err:
             print(f"Error selecting database: {err}")
             return False
     
+    @instrumented
     def create_database(self, purpose: str) -> bool:
         """Create a database with naming purpose."""
         try:
-            # Format database name
-            self.db_name = f"{purpose}"
             # Sanitize database name (remove special characters)
-            self.db_name = re.sub(r'[^\w]', '', self.db_name)
+            db_name = re.sub(r'[^\w]', '', f"{purpose}")
             
-            # Create database
-            self.cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.db_name}")
-            self.cursor.execute(f"USE {self.db_name}")
+            # Create database; self.db_name changes afterwards, or a pooled session
+            # would USE the not-yet-existing database before CREATE DATABASE ran
+            with self._session() as (connection, cursor):
+                cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name}")
+                cursor.execute(f"USE {db_name}")
+                self._reset_statements()
+            self.db_name = db_name
+            self._databases = None
             print(f"Database '{self.db_name}' created and selected successfully!")
             return True
         except mysql.connector.Error as err:
             print(f"Error creating database: {err}")
             return False
     
+    @instrumented
     def create_tables(self) -> bool:
         """Create User and Login tables."""
         try:
-            # Create User table
-            self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS User (
-                userId INT AUTO_INCREMENT PRIMARY KEY,
-                firstName VARCHAR(50) NOT NULL,
-                lastName VARCHAR(50) NOT NULL,
-                email VARCHAR(100) NOT NULL,
-                accessLevel ENUM('basic', 'admin') DEFAULT 'basic'
-            )
-            """)
+            with self._session() as (connection, cursor):
+                # Create User table
+                cursor.execute(CREATE_USER_TABLE)
             
-            # Create Login table
-            self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Login (
-                loginId INT AUTO_INCREMENT PRIMARY KEY,
-                userId INT UNIQUE,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                FOREIGN KEY (userId) REFERENCES User(userId) ON DELETE CASCADE
-            )
-            """)
+                # Create Login table
+                cursor.execute(CREATE_LOGIN_TABLE)
             
-            print("Tables created successfully!")
-            return True
+                print("Tables created successfully!")
+                return True
         except mysql.connector.Error as err:
             print(f"Error creating tables: {err}")
             return False
     
-    def insert_user(self, first_name: str, last_name: str, email: str, access_level: str) -> Optional[int]:
-        """Insert a new user and return the user ID."""
+    def schema_version(self) -> int:
+        """Return the applied schema version (0 if the database is unversioned)."""
+        with self._session() as (connection, cursor):
+            try:
+                cursor.execute("SELECT MAX(version) FROM schema_version")
+            except mysql.connector.Error as err:
+                if getattr(err, 'errno', None) == ER_NO_SUCH_TABLE:
+                    return 0
+                raise
+            return cursor.fetchone()[0] or 0
+    
+    def duplicate_emails(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """Return (email, count) for emails shared by several users, most repeated first."""
+        try:
+            with self._session() as (connection, cursor):
+                cursor.execute("SELECT email, COUNT(*) FROM User GROUP BY email HAVING COUNT(*) > 1 "
+                               "ORDER BY COUNT(*) DESC, email LIMIT %s", (limit,))
+                return [(email, count) for email, count in cursor.fetchall()]
+        except mysql.connector.Error as err:
+            print(f"Error finding duplicate emails: {err}")
+            return []
+    
+    def blocked_by_duplicate_emails(self) -> bool:
+        """Return True if only the unique email index is missing, because emails repeat.
+
+        Such a database is usable: every other index is in place and only new
+        duplicate emails go unrejected.
+        """
+        try:
+            version = self.schema_version()
+        except mysql.connector.Error:
+            return False
+        return version == SCHEMA_MIGRATIONS[-2][0] and bool(self.duplicate_emails(limit=1))
+    
+    @instrumented
+    def migrate(self, online: bool = True) -> bool:
+        """Bring the selected database up to the latest SCHEMA_MIGRATIONS version.
+
+        When the schema is already current this costs a single SELECT and runs
+        no DDL, and nothing at all once the version is known from
+        ``schema_versions``. Every step is idempotent, so an interrupted run
+        can simply be repeated. With ``online`` set, indexes are built with
+        ALGORITHM=INPLACE, LOCK=NONE so large tables stay writable.
+        """
+        latest = SCHEMA_MIGRATIONS[-1][0]
+        if self.schema_versions.get(self.db_name, 0) >= latest:
+            return True
+        try:
+            current = self.schema_version()
+            if current >= latest:
+                self.schema_versions[self.db_name] = current
+                print(f"Schema is up to date (version {current}).")
+                return True
+
+            with self._session() as (connection, cursor):
+                cursor.execute(CREATE_SCHEMA_VERSION_TABLE)
+                for version, description, steps in SCHEMA_MIGRATIONS:
+                    if version <= current:
+                        continue
+                    print(f"Applying schema migration {version}: {description}...")
+                    for step in steps:
+                        if isinstance(step, str):
+                            cursor.execute(step)
+                        else:
+                            self._ensure_index(cursor, online=online, **step)
+                    cursor.execute(
+                        "INSERT IGNORE INTO schema_version (version, description) VALUES (%s, %s)",
+                        (version, description)
+                    )
+                    connection.commit()
+            self.schema_versions[self.db_name] = latest
+            print(f"Schema migrated to version {latest}.")
+            return True
+        except mysql.connector.Error as err:
+            print(f"Error migrating schema: {err}")
+            if getattr(err, 'errno', None) == ER_DUP_ENTRY:
+                # The last migration adds a unique index on User.email
+                duplicates = self.duplicate_emails()
+                if duplicates:
+                    print("These emails belong to more than one user; make them unique and run again:")
+                    for email, count in duplicates:
+                        print(f"  {email} ({count} users)")
+            return False
+    
+    def _ensure_index(self, cursor, table: str, name: str, columns: str, unique: bool = False,
+                      online: bool = True):
+        """Create an index unless one with that name already exists."""
+        cursor.execute(INDEX_EXISTS_SQL, (table, name))
+        if cursor.fetchone():
+            return
+        ddl = f"ALTER TABLE {table} ADD {'UNIQUE ' if unique else ''}INDEX {name} ({columns})"
+        if online:
+            try:
+                cursor.execute(f"{ddl}, ALGORITHM=INPLACE, LOCK=NONE")
+                return
+            except mysql.connector.Error as err:
+                if getattr(err, 'errno', None) not in (ER_ALTER_OPERATION_NOT_SUPPORTED,
+                                                         ER_ALTER_OPERATION_NOT_SUPPORTED_REASON):
+                    raise
+                print(f"Online index build not supported for {name}; falling back to a locking build.")
+        cursor.execute(ddl)
+    
+    @instrumented
+    def insert_user(self, first_name: str, last_name: str, email: str, access_level: str) -> Optional[int]:
+        """Insert a new user and return the user ID."""
+        try:
+            with self._session() as (connection, cursor):
+                query = """
+                INSERT INTO User (firstName, lastName, email, accessLevel)
+                VALUES (%s, %s, %s, %s)
+                """
+                values = (first_name, last_name, email, access_level)
+                cursor.execute(query, values)
+                connection.commit()
+            
+                user_id = cursor.lastrowid
+                # Drop any cached "not found" for the new ID
+                self._invalidate(user_ids=[user_id])
+                print(f"User added successfully with ID: {user_id}")
+                return user_id
+        except mysql.connector.Error as err:
+            print(f"Error inserting user: {err}")
+            return None
+    
+    @instrumented
+    def insert_login(self, user_id: int, username: str, password: str,
+                     hashed_password: str = None) -> bool:
+        """Insert login credentials with encrypted password.
+
+        Pass ``hashed_password`` to store a hash computed elsewhere (e.g. in a worker process).
+        """
+        try:
+            with self._session() as (connection, cursor):
+                # Hash the password
+                if hashed_password is None:
+                    hashed_password = self._encrypt_password(password)
+            
+                query = """
+                INSERT INTO Login (userId, username, password)
+                VALUES (%s, %s, %s)
+                """
+                values = (user_id, username, hashed_password)
+                cursor.execute(query, values)
+                connection.commit()
+                self._invalidate(keys=[f"login:{username}"])
+            
+                print(f"Login credentials added successfully for user ID: {user_id}")
+                return True
+        except mysql.connector.Error as err:
+            print(f"Error inserting login: {err}")
+            return False
+    
+    @instrumented
+    def create_user_with_login(self, first_name: str, last_name: str, email: str, access_level: str,
+                               username: str, password: str) -> Optional[int]:
+        """Insert a user and their login with one commit; neither row is kept if either insert fails."""
+        # Hash first so the transaction doesn't hold row locks through bcrypt
+        hashed_password = self._encrypt_password(password)
+        try:
+            with self.transaction():
+                user_id = self.insert_user(first_name, last_name, email, access_level)
+                if user_id is None or not self.insert_login(user_id, username, password,
+                                                            hashed_password=hashed_password):
+                    return None
+            return user_id
+        except mysql.connector.Error as err:
+            print(f"User and login were not created: {err}")
+            return None
+    
+    @instrumented
+    def import_users(self, rows: Iterable[Dict], batch_size: int = IMPORT_BATCH_SIZE,
+                     workers: Optional[int] = None, reject_path: Optional[str] = None) -> Dict:
+        """Bulk import users and logins.
+
+        Rows are processed in transactions of ``batch_size``. Passwords are hashed
+        across a process pool, User and Login rows are written with multi-row
+        INSERTs, and rows that fail are written to ``reject_path`` (JSONL) instead
+        of aborting the import.
+        """
+        stats = {'imported': 0, 'rejected': 0, 'batches': 0}
+        reject_file = open(reject_path, 'w', encoding='utf-8') if reject_path else None
+
+        def reject(row: Dict, reason: str):
+            stats['rejected'] += 1
+            if reject_file:
+                record = {k: v for k, v in row.items() if k not in ('password', '_raw')}
+                if '_raw' in row:
+                    record['raw'] = row['_raw']
+                record['error'] = reason
+                reject_file.write(json.dumps(record) + "\n")
+
+        # Hand each worker a few chunks per batch to keep IPC overhead low
+        chunksize = max(1, batch_size // (4 * (workers or os.cpu_count() or 1)))
+        start = time.perf_counter()
+        try:
+            with futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                batch = []
+                for row in rows:
+                    error = _validate_import_row(row)
+                    if error:
+                        reject(row, error)
+                        continue
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        stats['imported'] += self._import_batch(batch, pool, chunksize, reject)
+                        stats['batches'] += 1
+                        batch = []
+                if batch:
+                    stats['imported'] += self._import_batch(batch, pool, chunksize, reject)
+                    stats['batches'] += 1
+        finally:
+            if reject_file:
+                reject_file.close()
+
+        if self.user_cache is not None and stats['imported']:
+            # New rows may have cached "not found" entries
+            self.user_cache.clear()
+        stats['elapsed'] = time.perf_counter() - start
+        stats['rows_per_sec'] = stats['imported'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+        print(f"Imported {stats['imported']} users ({stats['rejected']} rejected) "
+              f"in {stats['elapsed']:.1f}s - {stats['rows_per_sec']:.0f} rows/sec")
+        return stats
+
+    def _import_batch(self, batch: List[Dict], pool: futures.ProcessPoolExecutor, chunksize: int, reject) -> int:
+        """Write one batch of validated rows in a single transaction. Returns rows imported."""
+        hash_password = functools.partial(_hash_password, rounds=self.bcrypt_rounds)
+        hashes = list(pool.map(hash_password, [row['password'] for row in batch], chunksize=chunksize))
+
+        user_values = [(row['first_name'], row['last_name'], row['email'], row['access_level'])
+                       for row in batch]
+        with self._session() as (connection, cursor):
+            try:
+                cursor.executemany(
+                    "INSERT INTO User (firstName, lastName, email, accessLevel) VALUES (%s, %s, %s, %s)",
+                    user_values
+                )
+                # A multi-row INSERT reserves a consecutive block of ids starting at lastrowid;
+                # confirm that before mapping ids back onto the login rows.
+                first_id = cursor.lastrowid
+                cursor.execute(
+                    "SELECT COUNT(*) FROM User WHERE userId BETWEEN %s AND %s",
+                    (first_id, first_id + len(batch) - 1)
+                )
+                if cursor.fetchone()[0] != len(batch):
+                    raise mysql.connector.Error(msg="auto-increment ids for batch are not consecutive")
+
+                login_values = [(first_id + i, row['username'], hashes[i]) for i, row in enumerate(batch)]
+                cursor.executemany(
+                    "INSERT INTO Login (userId, username, password) VALUES (%s, %s, %s)",
+                    login_values
+                )
+                connection.commit()
+                return len(batch)
+            except mysql.connector.Error:
+                # Something in the batch is bad (e.g. duplicate username); redo it row by row
+                # so only the offending rows are rejected.
+                connection.rollback()
+                return self._import_rows(batch, hashes, reject)
+
+    def _import_rows(self, batch: List[Dict], hashes: List[str], reject) -> int:
+        """Slow path for a failed batch: insert row by row using savepoints."""
+        imported = 0
+        with self._session() as (connection, cursor):
+            for row, hashed_password in zip(batch, hashes):
+                try:
+                    cursor.execute("SAVEPOINT import_row")
+                    cursor.execute(
+                        "INSERT INTO User (firstName, lastName, email, accessLevel) VALUES (%s, %s, %s, %s)",
+                        (row['first_name'], row['last_name'], row['email'], row['access_level'])
+                    )
+                    cursor.execute(
+                        "INSERT INTO Login (userId, username, password) VALUES (%s, %s, %s)",
+                        (cursor.lastrowid, row['username'], hashed_password)
+                    )
+                    imported += 1
+                except mysql.connector.Error as err:
+                    cursor.execute("ROLLBACK TO SAVEPOINT import_row")
+                    reject(row, str(err))
+            connection.commit()
+        return imported
+
+    @instrumented
+    def _encrypt_password(self, password: str) -> str:
+        """Encrypt password using bcrypt."""
+        return _hash_password(password, self.bcrypt_rounds)
+    
+    @instrumented
+    def verify_password(self, entered_password: str, stored_password: str) -> bool:
+        """Verify password against stored hash."""
+        return _check_password(entered_password, stored_password)
+    
+    def needs_rehash(self, stored_password: str) -> bool:
+        """True if a stored hash was made with a different cost than bcrypt_rounds."""
+        return self.bcrypt_rounds is not None and bcrypt_cost(stored_password) != self.bcrypt_rounds
+    
+    def _replace_hash(self, login_id: int, old_hash: str, new_hash: str) -> bool:
+        """Swap in a rehashed password, unless the password was changed meanwhile."""
+        try:
+            with self._session() as (connection, cursor):
+                cursor.execute(
+                    "UPDATE Login SET password = %s WHERE loginId = %s AND password = %s",
+                    (new_hash, login_id, old_hash)
+                )
+                connection.commit()
+                self._invalidate(login_ids=[login_id])
+                return cursor.rowcount > 0
+        except mysql.connector.Error as err:
+            print(f"Error rehashing password: {err}")
+            return False
+    
+    @replica_read
+    def _lookup_credentials(self, username: str) -> Optional[Tuple[int, int, str]]:
+        """Return (loginId, userId, password hash) for a username using the unique index."""
+        with self._session(read=True) as (connection, cursor):
+            cursor.execute("SELECT loginId, userId, password FROM Login WHERE username = %s", (username,))
+            return cursor.fetchone()
+    
+    @instrumented
+    def authenticate(self, username: str, password: str) -> Optional[int]:
+        """Check a username and password. Returns the user ID on success, otherwise None.
+
+        Successful checks are cached for ``auth_cache_ttl`` seconds, so a repeat
+        login with the same credentials and unchanged hash skips bcrypt. A hash
+        made with an outdated cost is transparently replaced at the current cost.
+        """
+        start = time.perf_counter()
+        try:
+            try:
+                credentials = self._lookup_credentials(username)
+            except mysql.connector.Error as err:
+                print(f"Error authenticating: {err}")
+                return None
+            if credentials is None:
+                return None
+
+            login_id, user_id, stored_password = credentials
+            key = self.auth_cache.key(username, password, stored_password)
+            if self.auth_cache.get(key):
+                return user_id
+            if self.verify_password(password, stored_password):
+                if self.needs_rehash(stored_password):
+                    new_hash = self._encrypt_password(password)
+                    if self._replace_hash(login_id, stored_password, new_hash):
+                        key = self.auth_cache.key(username, password, new_hash)
+                self.auth_cache.put(key, user_id, login_id)
+                return user_id
+            return None
+        finally:
+            self.auth_cache.record_latency(time.perf_counter() - start)
+    
+    def auth_stats(self) -> Dict:
+        """Return authentication cache hit/miss counters and latency percentiles."""
+        return self.auth_cache.stats()
+    
+    @instrumented
+    @replica_read
+    def select_all_users(self) -> List[UserRow]:
+        """Retrieve all users from the User table."""
+        try:
+            with self._session(read=True) as (connection, cursor):
+                cursor.execute("SELECT userId, firstName, lastName, email, accessLevel FROM User")
+                if self.row_format == 'record':
+                    return [UserRecord._make(row) for row in cursor]
+                users = []
+                for (user_id, first_name, last_name, email, access_level) in cursor:
+                    users.append({
+                        'userId': user_id,
+                        'firstName': first_name,
+                        'lastName': last_name,
+                        'email': email,
+                        'accessLevel': access_level
+                    })
+                return users
+        except mysql.connector.Error as err:
+            print(f"Error selecting users: {err}")
+            return []
+    
+    @instrumented
+    @replica_read
+    def select_all_users_columnar(self, batch_size: int = 10000) -> UserTable:
+        """Retrieve all users into a column-oriented UserTable (compact for large tables)."""
+        table = UserTable()
+        try:
+            with self._session(read=True) as (connection, cursor):
+                stream = connection.cursor(buffered=False)
+                try:
+                    stream.execute("SELECT userId, firstName, lastName, email, accessLevel FROM User ORDER BY userId")
+                    while True:
+                        rows = stream.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        table.extend(rows)
+                finally:
+                    stream.close()
+        except mysql.connector.Error as err:
+            print(f"Error selecting users: {err}")
+        return table
+    
+    def iter_users(self, batch_size: int = 1000) -> Iterator[UserRow]:
+        """Stream all users in userId order without loading the table into memory.
+
+        Rows are read from an unbuffered cursor in ``fetchmany`` batches. The
+        connection is held until the generator is exhausted or closed, so don't
+        run other queries on this manager from the same thread while iterating;
+        use select_users_page for that.
+        """
+        try:
+            with self._session(read=True) as (connection, cursor):
+                stream = connection.cursor(buffered=False)
+                try:
+                    stream.execute("SELECT userId, firstName, lastName, email, accessLevel FROM User ORDER BY userId")
+                    while True:
+                        rows = stream.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        for row in rows:
+                            yield self._user_row(row)
+                finally:
+                    stream.close()
+        except mysql.connector.Error as err:
+            print(f"Error streaming users: {err}")
+    
+    def iter_user_login_chunks(self, after_id: int = 0, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[Tuple]]:
+        """Stream User rows joined with their Login (no password) as lists of tuples.
+
+        Columns are EXPORT_COLUMNS; users without a login have None for the login
+        columns. Rows come in userId order from an unbuffered cursor, starting
+        after ``after_id``.
+        """
+        with self._session(read=True) as (connection, cursor):
+            stream = connection.cursor(buffered=False)
+            try:
+                stream.execute("""
+                SELECT u.userId, u.firstName, u.lastName, u.email, u.accessLevel, l.loginId, l.username
+                FROM User u
+                LEFT JOIN Login l ON l.userId = u.userId
+                WHERE u.userId > %s
+                ORDER BY u.userId
+                """, (after_id,))
+                while True:
+                    rows = stream.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                stream.close()
+    
+    @instrumented
+    def export_users(self, output, fmt: str = 'csv', after_id: int = 0, state_file: str = None,
+                     batch_size: int = EXPORT_BATCH_SIZE) -> Dict:
+        """Export users joined with logins (never password hashes) with constant memory.
+
+        ``output`` is a path or a text stream (csv/jsonl only). ``fmt`` is 'csv',
+        'jsonl' or 'parquet' (needs pyarrow); a path ending in .gz is gzip
+        compressed. With ``state_file`` the export is incremental: only users
+        above the userId high-water mark saved by the previous run are
+        exported, and the mark is advanced once the file is complete.
+        """
+        state = {}
+        if state_file and os.path.exists(state_file):
+            with open(state_file, encoding='utf-8') as f:
+                state = json.load(f)
+        after_id = max(after_id, state.get('last_user_id', 0))
+
+        stats = {'rows': 0, 'first_user_id': None, 'last_user_id': after_id}
+        start = time.perf_counter()
+        try:
+            with _open_export_writer(output, fmt) as write_chunk:
+                for rows in self.iter_user_login_chunks(after_id, batch_size):
+                    write_chunk(rows)
+                    stats['rows'] += len(rows)
+                    if stats['first_user_id'] is None:
+                        stats['first_user_id'] = rows[0][0]
+                    stats['last_user_id'] = rows[-1][0]
+        except (mysql.connector.Error, ImportError, ValueError) as err:
+            print(f"Error exporting users: {err}")
+            stats['error'] = str(err)
+            return stats
+
+        if state_file:
+            state.update({'last_user_id': stats['last_user_id'], 'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S')})
+            temp_path = state_file + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2)
+            os.replace(temp_path, state_file)
+
+        stats['elapsed'] = time.perf_counter() - start
+        stats['rows_per_sec'] = stats['rows'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+        print(f"Exported {stats['rows']} rows in {stats['elapsed']:.1f}s - {stats['rows_per_sec']:.0f} rows/sec")
+        return stats
+    
+    @instrumented
+    @replica_read
+    def select_users_page(self, after_id: int = 0, limit: int = 50) -> List[UserRow]:
+        """Return up to ``limit`` users with userId greater than ``after_id`` (keyset pagination).
+
+        Pass the last userId of one page as ``after_id`` to get the next page.
+        """
         try:
-            query = """
-            INSERT INTO User (firstName, lastName, email, accessLevel)
-            VALUES (%s, %s, %s, %s)
-            """
-            values = (first_name, last_name, email, access_level)
-            self.cursor.execute(query, values)
-            self.connection.commit()
-            
-            user_id = self.cursor.lastrowid
-            print(f"User added successfully with ID: {user_id}")
-            return user_id
+            with self._session(read=True) as (connection, cursor):
+                query = """
+                SELECT userId, firstName, lastName, email, accessLevel FROM User
+                WHERE userId > %s ORDER BY userId LIMIT %s
+                """
+                cursor.execute(query, (after_id, limit))
+                return [self._user_row(row) for row in cursor.fetchall()]
         except mysql.connector.Error as err:
-            print(f"Error inserting user: {err}")
-            return None
+            print(f"Error selecting users: {err}")
+            return []
+    
+    def _user_search_filter(self, email: str = None, name_prefix: str = None,
+                            access_level: str = None) -> List[Tuple[str, List]]:
+        """Build the WHERE clauses and parameters shared by the search methods.
+
+        Each predicate maps onto an index from SCHEMA_MIGRATIONS: uq_user_email,
+        idx_user_last_first / idx_user_first_name (prefix LIKE is a range scan)
+        and idx_user_access_level. A name prefix may match either name, and an
+        OR across two indexes can't be one range scan, so it gives two clauses,
+        a lastName prefix and a firstName prefix, that callers UNION.
+        """
+        conditions = []
+        params = []
+        if email is not None:
+            conditions.append("email = %s")
+            params.append(email)
+        if access_level is not None:
+            conditions.append("accessLevel = %s")
+            params.append(access_level)
+        if not name_prefix:
+            return [(" AND ".join(conditions) or "1 = 1", params)]
+        pattern = _like_escape(name_prefix) + '%'
+        return [(" AND ".join([f"{column} LIKE %s ESCAPE '!'"] + conditions), [pattern] + params)
+                for column in ('lastName', 'firstName')]
+    
+    def _user_search_sql(self, email: str = None, name_prefix: str = None, access_level: str = None,
+                         after_id: int = 0, limit: int = 50) -> Dict[str, Tuple[str, List]]:
+        """Return the search_users and count_users statements as {'search': ..., 'count': ...}."""
+        clauses = self._user_search_filter(email, name_prefix, access_level)
+        if len(clauses) == 1:
+            where, params = clauses[0]
+            return {
+                'search': (f"SELECT userId, firstName, lastName, email, accessLevel FROM User "
+                           f"WHERE {where} AND userId > %s ORDER BY userId LIMIT %s", params + [after_id, limit]),
+                'count': (f"SELECT COUNT(*) FROM User WHERE {where}", params),
+            }
+        # Collect matching ids with one index range scan per clause, then fetch and page them
+        params = [param for _, clause_params in clauses for param in clause_params]
+        matches = " UNION ".join(f"SELECT userId FROM User WHERE {where} AND userId > %s" for where, _ in clauses)
+        match_params = [param for _, clause_params in clauses for param in clause_params + [after_id]]
+        return {
+            'search': (f"SELECT u.userId, u.firstName, u.lastName, u.email, u.accessLevel FROM ({matches}) matches "
+                       f"JOIN User u ON u.userId = matches.userId ORDER BY u.userId LIMIT %s", match_params + [limit]),
+            'count': ("SELECT COUNT(*) FROM (" + " UNION ".join(f"SELECT userId FROM User WHERE {where}"
+                                                               for where, _ in clauses) + ") matches", params),
+        }
     
-    def insert_login(self, user_id: int, username: str, password: str) -> bool:
-        """Insert login credentials with encrypted password."""
+    @instrumented
+    @replica_read
+    def search_users(self, email: str = None, name_prefix: str = None, access_level: str = None,
+                     after_id: int = 0, limit: int = 50) -> List[UserRow]:
+        """Find users by exact email, first/last name prefix and/or access level.
+
+        Predicates are combined with AND. Results are keyset-paged by userId:
+        pass the last userId of one page as ``after_id`` to get the next.
+        """
         try:
-            # Hash the password
-            hashed_password = self._encrypt_password(password)
-            
-            query = """
-            INSERT INTO Login (userId, username, password)
-            VALUES (%s, %s, %s)
-            """
-            values = (user_id, username, hashed_password)
-            self.cursor.execute(query, values)
-            self.connection.commit()
-            
-            print(f"Login credentials added successfully for user ID: {user_id}")
-            return True
+            query, params = self._user_search_sql(email, name_prefix, access_level, after_id, limit)['search']
+            with self._session(read=True) as (connection, cursor):
+                cursor.execute(query, params)
+                return [self._user_row(row) for row in cursor.fetchall()]
         except mysql.connector.Error as err:
-            print(f"Error inserting login: {err}")
-            return False
-    
-    def _encrypt_password(self, password: str) -> str:
-        """Encrypt password using bcrypt."""
-        password_bytes = password.encode('utf-8')
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password_bytes, salt)
-        return hashed_password.decode('utf-8')
+            print(f"Error searching users: {err}")
+            return []
     
-    def verify_password(self, entered_password: str, stored_password: str) -> bool:
-        """Verify password against stored hash."""
-        return bcrypt.checkpw(entered_password.encode('utf-8'), stored_password.encode('utf-8'))
+    @instrumented
+    @replica_read
+    def count_users(self, email: str = None, name_prefix: str = None, access_level: str = None) -> int:
+        """Count users matching the same predicates as search_users."""
+        try:
+            query, params = self._user_search_sql(email, name_prefix, access_level)['count']
+            with self._session(read=True) as (connection, cursor):
+                cursor.execute(query, params)
+                return cursor.fetchone()[0]
+        except mysql.connector.Error as err:
+            print(f"Error counting users: {err}")
+            return 0
     
-    def select_all_users(self) -> List[Dict]:
-        """Retrieve all users from the User table."""
+    def explain_search(self, email: str = None, name_prefix: str = None, access_level: str = None,
+                       after_id: int = 0, limit: int = 50) -> List[Dict]:
+        """Return the EXPLAIN plans for a search_users query and its count_users query.
+
+        Each plan row is a dict of EXPLAIN columns plus 'query' ('search' or
+        'count') and 'full_scan'. A step is a full scan when MySQL reads the
+        whole table (type ALL), or when there are predicates but no secondary
+        index serves them: key PRIMARY or NULL (or a full index scan) means
+        rows are walked in userId order and filtered. On SQLite the rows come
+        from EXPLAIN QUERY PLAN, where "SCAN" and a rowid range ("USING
+        INTEGER PRIMARY KEY") are the equivalents.
+        """
         try:
-            self.cursor.execute("SELECT userId, firstName, lastName, email, accessLevel FROM User")
-            users = []
-            for (user_id, first_name, last_name, email, access_level) in self.cursor:
-                users.append({
-                    'userId': user_id,
-                    'firstName': first_name,
-                    'lastName': last_name,
-                    'email': email,
-                    'accessLevel': access_level
-                })
-            return users
+            queries = self._user_search_sql(email, name_prefix, access_level, after_id, limit)
+            filtered = any(value is not None for value in (email, name_prefix or None, access_level))
+            plan = []
+            with self._session() as (connection, cursor):
+                for name, (query, query_params) in queries.items():
+                    cursor.execute(f"EXPLAIN {query}", query_params)
+                    columns = [column[0] for column in cursor.description]
+                    for row in cursor.fetchall():
+                        step = dict(zip(columns, row))
+                        step['query'] = name
+                        step['full_scan'] = self._is_full_scan(step, filtered)
+                        plan.append(step)
+            return plan
         except mysql.connector.Error as err:
-            print(f"Error selecting users: {err}")
+            print(f"Error explaining search: {err}")
             return []
     
-    def select_user_by_id(self, user_id: int) -> Optional[Dict]:
+    @staticmethod
+    def _is_full_scan(step: Dict, filtered: bool) -> bool:
+        """Whether an EXPLAIN step reads User without an index serving the predicates."""
+        if 'detail' in step:
+            detail = str(step['detail'])
+            if not detail.startswith(('SCAN User', 'SEARCH User')):
+                return False  # e.g. "USE TEMP B-TREE FOR ORDER BY" or the UNION's own result
+            if detail.startswith('SCAN ') and 'USING' not in detail:
+                return True
+            return filtered and (detail.startswith('SCAN ') or 'INTEGER PRIMARY KEY' in detail)
+        if step.get('table') != 'User':
+            return False  # <union1,2> / <derived2>: the temporary result of a UNION
+        if step.get('type') == 'ALL':
+            return True
+        return filtered and (step.get('type') == 'index' or step.get('key') in (None, 'PRIMARY'))
+    
+    @instrumented
+    @replica_read
+    def select_user_by_id(self, user_id: int) -> Optional[UserRow]:
         """Retrieve a specific user by ID."""
-        try:
-            query = "SELECT userId, firstName, lastName, email, accessLevel FROM User WHERE userId = %s"
-            self.cursor.execute(query, (user_id,))
-            result = self.cursor.fetchone()
-            
-            if result:
-                user_id, first_name, last_name, email, access_level = result
-                return {
-                    'userId': user_id,
-                    'firstName': first_name,
-                    'lastName': last_name,
-                    'email': email,
-                    'accessLevel': access_level
-                }
-            else:
+        cache_key = f"user:{user_id}"
+        hit, cached = self._cache_get(cache_key)
+        if hit:
+            if cached is None:
                 print(f"No user found with ID: {user_id}")
                 return None
+            return UserRecord(**cached) if self.row_format == 'record' else dict(cached)
+        try:
+            with self._session(read=True) as (connection, cursor):
+                query = "SELECT userId, firstName, lastName, email, accessLevel FROM User WHERE userId = %s"
+                cursor.execute(query, (user_id,))
+                result = cursor.fetchone()
+            
+                if result:
+                    user_id, first_name, last_name, email, access_level = result
+                    user = {
+                        'userId': user_id,
+                        'firstName': first_name,
+                        'lastName': last_name,
+                        'email': email,
+                        'accessLevel': access_level
+                    }
+                    self._cache_put(cache_key, user, [cache_key])
+                    return UserRecord._make(result) if self.row_format == 'record' else dict(user)
+                else:
+                    self._cache_put(cache_key, None, [cache_key])
+                    print(f"No user found with ID: {user_id}")
+                    return None
         except mysql.connector.Error as err:
             print(f"Error selecting user: {err}")
             return None
     
-    def select_login_by_username(self, username: str) -> Optional[Dict]:
+    @instrumented
+    @replica_read
+    def select_login_by_username(self, username: str) -> Optional[LoginRow]:
         """Retrieve login information by username."""
-        try:
-            query = """
-            SELECT l.loginId, l.userId, l.username, l.password, u.firstName, u.lastName, u.email, u.accessLevel
-            FROM Login l
-            JOIN User u ON l.userId = u.userId
-            WHERE l.username = %s
-            """
-            self.cursor.execute(query, (username,))
-            result = self.cursor.fetchone()
-            
-            if result:
-                login_id, user_id, username, password, first_name, last_name, email, access_level = result
-                return {
-                    'loginId': login_id,
-                    'userId': user_id,
-                    'username': username,
-                    'password': password,
-                    'firstName': first_name,
-                    'lastName': last_name,
-                    'email': email,
-                    'accessLevel': access_level
-                }
-            else:
+        cache_key = f"login:{username}"
+        hit, cached = self._cache_get(cache_key)
+        if hit:
+            if cached is None:
                 print(f"No login found with username: {username}")
                 return None
+            return LoginRecord(**cached) if self.row_format == 'record' else dict(cached)
+        try:
+            with self._session(read=True) as (connection, cursor):
+                query = """
+                SELECT l.loginId, l.userId, l.username, l.password, u.firstName, u.lastName, u.email, u.accessLevel
+                FROM Login l
+                JOIN User u ON l.userId = u.userId
+                WHERE l.username = %s
+                """
+                cursor.execute(query, (username,))
+                result = cursor.fetchone()
+            
+                if result:
+                    login_id, user_id, username, password, first_name, last_name, email, access_level = result
+                    login = {
+                        'loginId': login_id,
+                        'userId': user_id,
+                        'username': username,
+                        'password': password,
+                        'firstName': first_name,
+                        'lastName': last_name,
+                        'email': email,
+                        'accessLevel': access_level
+                    }
+                    # Tagged with the user too: it carries User columns
+                    self._cache_put(cache_key, login, [cache_key, f"user:{user_id}", f"login_id:{login_id}"])
+                    return LoginRecord._make(result) if self.row_format == 'record' else dict(login)
+                else:
+                    self._cache_put(cache_key, None, [cache_key])
+                    print(f"No login found with username: {username}")
+                    return None
         except mysql.connector.Error as err:
             print(f"Error selecting login: {err}")
             return None
     
+    def _user_update_values(self, user_id: int, first_name: str = None, last_name: str = None,
+                            email: str = None, access_level: str = None) -> Optional[List]:
+        """Return UPDATE_USER_SQL parameters, or None when no field was supplied."""
+        values = [first_name, last_name, email, access_level]
+        if all(value is None for value in values):
+            return None
+        return values + [user_id]
+    
+    def last_call_stats(self) -> Dict:
+        """Statement/round-trip accounting for this thread's last update_user(s) call.
+
+        Round trips are counted by the instrumented cursor, so they are None
+        while instrumentation is disabled.
+        """
+        return dict(getattr(self._local, 'call_stats', {}))
+    
+    @instrumented
     def update_user(self, user_id: int, first_name: str = None, last_name: str = None, 
                     email: str = None, access_level: str = None) -> bool:
-        """Update user information."""
+        """Update user information.
+
+        Only the supplied columns change, in a single UPDATE. The connection
+        reports matched rows, so that one statement tells "not found" apart
+        from "updated" even when the values were already set;
+        last_call_stats() reports which case occurred and how many statements
+        and round trips were used.
+        """
+        stats = {'statements': 0, 'round_trips': None, 'status': None}
+        self._local.call_stats = stats
+        frame = self.instrumentation.current()
         try:
-            # Get current user data
-            current_user = self.select_user_by_id(user_id)
-            if not current_user:
-                return False
+            with self._session() as (connection, cursor):
+                values = self._user_update_values(user_id, first_name, last_name, email, access_level)
+                if values is None:
+                    print("No updates specified for user")
+                    stats['status'] = 'unchanged'
+                    return False
             
-            # Update with new values or keep current ones
-            first_name = first_name if first_name is not None else current_user['firstName']
-            last_name = last_name if last_name is not None else current_user['lastName']
-            email = email if email is not None else current_user['email']
-            access_level = access_level if access_level is not None else current_user['accessLevel']
+                cursor.execute(UPDATE_USER_SQL, values)
+                connection.commit()
+                self._invalidate(user_ids=[user_id])
+                stats['statements'] += 1
             
-            query = """
-            UPDATE User 
-            SET firstName = %s, lastName = %s, email = %s, accessLevel = %s
-            WHERE userId = %s
-            """
-            values = (first_name, last_name, email, access_level, user_id)
-            self.cursor.execute(query, values)
-            self.connection.commit()
-            
-            if self.cursor.rowcount > 0:
-                print(f"User with ID {user_id} updated successfully!")
-                return True
-            else:
-                print(f"No changes made to user with ID {user_id}")
+                if cursor.rowcount > 0:
+                    stats['status'] = 'updated'
+                    print(f"User with ID {user_id} updated successfully!")
+                    return True
+                stats['status'] = 'not_found'
+                print(f"No user found with ID: {user_id}")
                 return False
         except mysql.connector.Error as err:
             print(f"Error updating user: {err}")
             return False
+        finally:
+            # Inside transaction() the deferred COMMIT isn't a round trip, and isn't counted
+            if frame is not None:
+                stats['round_trips'] = frame['round_trips']
     
-    def update_login(self, user_id: int, username: str = None, password: str = None) -> bool:
-        """Update login information."""
+    @instrumented
+    def update_users(self, updates: Iterable[Dict]) -> Dict:
+        """Apply many users' updates in one transaction.
+
+        Each item is a dict with 'user_id' plus any of 'first_name', 'last_name',
+        'email' and 'access_level'. Every item runs through the one UPDATE_USER_SQL
+        statement via executemany. Returns counts of requested and matched rows
+        plus statement and round-trip totals.
+        """
+        rows = []
+        for item in updates:
+            values = self._user_update_values(item['user_id'], item.get('first_name'), item.get('last_name'),
+                                              item.get('email'), item.get('access_level'))
+            if values is not None:
+                rows.append(values)
+        requested = len(rows)
+
+        stats = {'requested': requested, 'matched': 0, 'statements': 0, 'round_trips': 0}
+        self._local.call_stats = stats
+        if not rows:
+            return stats
+        frame = self.instrumentation.current()
         try:
-            # Build the query dynamically based on what's being updated
-            query_parts = []
-            values = []
-            
-            if username is not None:
-                query_parts.append("username = %s")
-                values.append(username)
-            
-            if password is not None:
-                query_parts.append("password = %s")
-                hashed_password = self._encrypt_password(password)
-                values.append(hashed_password)
-            
-            if not query_parts:
-                print("No updates specified for login")
-                return False
+            with self._session() as (connection, cursor):
+                try:
+                    cursor.executemany(UPDATE_USER_SQL, rows)
+                    stats['matched'] += max(cursor.rowcount, 0)
+                    stats['statements'] += len(rows)
+                    connection.commit()
+                    self._invalidate(user_ids=[row[-1] for row in rows])
+                except mysql.connector.Error:
+                    connection.rollback()
+                    raise
+            print(f"Updated {stats['matched']} of {requested} users in one transaction.")
+        except mysql.connector.Error as err:
+            print(f"Error updating users: {err}")
+            stats['matched'] = 0
+        stats['round_trips'] = frame['round_trips'] if frame is not None else None
+        return stats
+    
+    @instrumented
+    def update_login(self, user_id: int, username: str = None, password: str = None,
+                     hashed_password: str = None) -> bool:
+        """Update login information.
+
+        Pass ``hashed_password`` instead of ``password`` to store a precomputed hash.
+        """
+        try:
+            with self._session() as (connection, cursor):
+                if password is not None and hashed_password is None:
+                    hashed_password = self._encrypt_password(password)
             
-            # Complete the query
-            query = f"UPDATE Login SET {', '.join(query_parts)} WHERE userId = %s"
-            values.append(user_id)
+                if username is None and hashed_password is None:
+                    print("No updates specified for login")
+                    return False
             
-            self.cursor.execute(query, values)
-            self.connection.commit()
+                # Unchanged fields are passed as NULL and kept by COALESCE
+                cursor.execute(UPDATE_LOGIN_SQL, (username, hashed_password, user_id))
+                connection.commit()
+                self._invalidate(user_ids=[user_id], keys=[f"login:{username}"] if username else ())
             
-            if self.cursor.rowcount > 0:
-                print(f"Login information for user ID {user_id} updated successfully!")
-                return True
-            else:
-                print(f"No changes made to login for user ID {user_id}")
-                return False
+                if cursor.rowcount > 0:
+                    print(f"Login information for user ID {user_id} updated successfully!")
+                    return True
+                else:
+                    print(f"No login found for user ID {user_id}")
+                    return False
         except mysql.connector.Error as err:
             print(f"Error updating login: {err}")
             return False
     
+    @instrumented
     def delete_user(self, user_id: int) -> bool:
         """Delete a user (will cascade delete their login due to constraints)."""
         try:
-            query = "DELETE FROM User WHERE userId = %s"
-            self.cursor.execute(query, (user_id,))
-            self.connection.commit()
+            with self._session() as (connection, cursor):
+                query = "DELETE FROM User WHERE userId = %s"
+                cursor.execute(query, (user_id,))
+                connection.commit()
+                self._invalidate(user_ids=[user_id])
             
-            if self.cursor.rowcount > 0:
-                print(f"User with ID {user_id} deleted successfully!")
-                return True
-            else:
-                print(f"No user found with ID {user_id}")
-                return False
+                if cursor.rowcount > 0:
+                    print(f"User with ID {user_id} deleted successfully!")
+                    return True
+                else:
+                    print(f"No user found with ID {user_id}")
+                    return False
         except mysql.connector.Error as err:
             print(f"Error deleting user: {err}")
             return False
     
+    @instrumented
     def delete_login(self, login_id: int) -> bool:
         """Delete a login record by login ID."""
         try:
-            query = "DELETE FROM Login WHERE loginId = %s"
-            self.cursor.execute(query, (login_id,))
-            self.connection.commit()
+            with self._session() as (connection, cursor):
+                query = "DELETE FROM Login WHERE loginId = %s"
+                cursor.execute(query, (login_id,))
+                connection.commit()
+                self._invalidate(login_ids=[login_id])
             
-            if self.cursor.rowcount > 0:
-                print(f"Login with ID {login_id} deleted successfully!")
-                return True
-            else:
-                print(f"No login found with ID {login_id}")
-                return False
+                if cursor.rowcount > 0:
+                    print(f"Login with ID {login_id} deleted successfully!")
+                    return True
+                else:
+                    print(f"No login found with ID {login_id}")
+                    return False
         except mysql.connector.Error as err:
             print(f"Error deleting login: {err}")
             return False
     
+    @instrumented
+    def delete_users(self, user_ids: Iterable[int] = None, access_level: str = None,
+                     email_domain: str = None, chunk_size: int = DELETE_CHUNK_SIZE) -> Dict:
+        """Bulk delete users (and their logins) by ID list and/or predicate.
+
+        Give either ``user_ids`` or at least one of ``access_level`` /
+        ``email_domain`` (e.g. 'example.com'); predicates are combined with AND.
+        Work is done in transactions of at most ``chunk_size`` users so locks
+        are held briefly and replicas keep up. Logins are deleted explicitly
+        before their users so both counts are exact. Returns rows removed per
+        table, chunks committed and elapsed time.
+        """
+        summary = {'User': 0, 'Login': 0, 'chunks': 0}
+        start = time.perf_counter()
+        try:
+            if user_ids is not None:
+                for chunk in _chunked(user_ids, chunk_size):
+                    self._delete_user_chunk(chunk, summary)
+            elif access_level is not None or email_domain is not None:
+                conditions = []
+                params = []
+                if access_level is not None:
+                    conditions.append("accessLevel = %s")
+                    params.append(access_level)
+                if email_domain is not None:
+                    conditions.append("email LIKE %s ESCAPE '!'")
+                    params.append('%@' + _like_escape(email_domain.lstrip('@')))
+                where = " AND ".join(conditions)
+                last_id = 0
+                while True:
+                    # Walk matching ids in primary-key order so each chunk is a bounded range scan
+                    with self._session() as (connection, cursor):
+                        cursor.execute(
+                            f"SELECT userId FROM User WHERE {where} AND userId > %s ORDER BY userId LIMIT %s",
+                            params + [last_id, chunk_size]
+                        )
+                        chunk = [row[0] for row in cursor.fetchall()]
+                    if not chunk:
+                        break
+                    self._delete_user_chunk(chunk, summary)
+                    last_id = chunk[-1]
+            else:
+                print("No users specified for bulk delete")
+        except mysql.connector.Error as err:
+            print(f"Error bulk deleting users: {err}")
+
+        summary['elapsed'] = time.perf_counter() - start
+        print(f"Deleted {summary['User']} users and {summary['Login']} logins "
+              f"in {summary['chunks']} chunk(s), {summary['elapsed']:.2f}s")
+        return summary
+    
+    def _delete_user_chunk(self, user_ids: List[int], summary: Dict):
+        """Delete one chunk of users and their logins in a single transaction."""
+        placeholders = ", ".join(["%s"] * len(user_ids))
+        with self._session() as (connection, cursor):
+            try:
+                cursor.execute(f"DELETE FROM Login WHERE userId IN ({placeholders})", user_ids)
+                logins = cursor.rowcount
+                cursor.execute(f"DELETE FROM User WHERE userId IN ({placeholders})", user_ids)
+                users = cursor.rowcount
+                connection.commit()
+            except mysql.connector.Error:
+                connection.rollback()
+                raise
+        self._invalidate(user_ids=user_ids)
+        summary['Login'] += logins
+        summary['User'] += users
+        summary['chunks'] += 1
+    
+    @instrumented
+    def delete_logins(self, login_ids: Iterable[int], chunk_size: int = DELETE_CHUNK_SIZE) -> Dict:
+        """Bulk delete login records by ID in transactions of at most ``chunk_size``."""
+        summary = {'Login': 0, 'chunks': 0}
+        start = time.perf_counter()
+        try:
+            for chunk in _chunked(login_ids, chunk_size):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                with self._session() as (connection, cursor):
+                    cursor.execute(f"DELETE FROM Login WHERE loginId IN ({placeholders})", chunk)
+                    connection.commit()
+                    summary['Login'] += cursor.rowcount
+                summary['chunks'] += 1
+                self._invalidate(login_ids=chunk)
+        except mysql.connector.Error as err:
+            print(f"Error bulk deleting logins: {err}")
+
+        summary['elapsed'] = time.perf_counter() - start
+        print(f"Deleted {summary['Login']} logins in {summary['chunks']} chunk(s), {summary['elapsed']:.2f}s")
+        return summary
+    
     def close_connection(self):
         """Close database connection."""
+        if self.replicas is not None:
+            self.replicas.close()
+        if self.pool:
+            self.pool.close()
+            print("Database connection pool closed.")
         if self.connection:
             if self.cursor:
                 self.cursor.close()
@@ -338,6 +3253,312 @@ class DatabaseManager:
             print("Database connection closed.")
 
 
+class GroupCommitter:
+    """Batch many small writes from a queue into shared transactions.
+
+    submit() queues a manager call and returns a Future. A background thread
+    runs queued calls in one DatabaseManager.transaction(), committing when
+    ``max_batch`` calls are gathered or ``max_delay`` seconds after the first
+    one arrived. Each call runs in its own savepoint, so a failing call only
+    undoes itself; its Future gets the call's return value (or the error
+    raised inside it) once the batch commits. stats() reports commits and
+    per-batch size and latency.
+    """
+
+    def __init__(self, manager: 'DatabaseManager', max_batch: int = 100, max_delay: float = 0.01,
+                 history: int = 1000):
+        self.manager = manager
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._batches = deque(maxlen=history)
+        self._stats = {'batches': 0, 'commits': 0, 'rollbacks': 0, 'calls': 0, 'failed_calls': 0,
+                       'commit_total': 0.0}
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def submit(self, func: Callable, *args, **kwargs) -> futures.Future:
+        """Queue ``func(*args, **kwargs)`` (usually a bound manager method) for the next batch."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("GroupCommitter is closed")
+            future = futures.Future()
+            self._queue.put((future, func, args, kwargs))
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit_batch(batch)
+            if stop:
+                return
+
+    def _commit_batch(self, batch: List[Tuple]):
+        start = time.perf_counter()
+        outcomes = []
+        commit_start = None
+        try:
+            with self.manager.transaction():
+                for future, func, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with self.manager.savepoint("group_commit_call"):
+                            result = func(*args, **kwargs)
+                    except Exception as err:
+                        outcomes.append((future, None, err))
+                    else:
+                        outcomes.append((future, result, None))
+                commit_start = time.perf_counter()
+        except Exception as err:
+            # The transaction failed (possibly before running every call, e.g. no
+            # connection), so nothing in this batch was kept
+            failed = 0
+            for future, _, _, _ in batch:
+                if not future.done():
+                    future.set_exception(err)
+                    failed += 1
+            self._record(len(batch), failed, None, time.perf_counter() - start)
+            return
+        commit_time = time.perf_counter() - commit_start
+        failed = 0
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                failed += 1
+                future.set_exception(error)
+        self._record(len(batch), failed, commit_time, time.perf_counter() - start)
+
+    def _record(self, size: int, failed: int, commit_time: Optional[float], elapsed: float):
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['calls'] += size
+            self._stats['failed_calls'] += failed
+            if commit_time is None:
+                self._stats['rollbacks'] += 1
+            else:
+                self._stats['commits'] += 1
+                self._stats['commit_total'] += commit_time
+            self._batches.append({'size': size, 'failed': failed,
+                                  'commit_ms': None if commit_time is None else commit_time * 1000,
+                                  'batch_ms': elapsed * 1000})
+
+    def stats(self) -> Dict:
+        """Return commit counts, average batch size and commit latency plus recent per-batch records."""
+        with self._lock:
+            stats = dict(self._stats)
+            batches = list(self._batches)
+        commit_times = [batch['commit_ms'] for batch in batches if batch['commit_ms'] is not None]
+        stats['avg_batch_size'] = stats['calls'] / stats['batches'] if stats['batches'] else 0.0
+        commit_total = stats.pop('commit_total')
+        stats['avg_commit_ms'] = commit_total * 1000 / stats['commits'] if stats['commits'] else 0.0
+        stats['p99_commit_ms'] = _percentile(commit_times, 99)
+        stats['recent_batches'] = batches
+        return stats
+
+    def close(self):
+        """Commit whatever is still queued and stop the background thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+
+class AsyncDatabaseManager:
+    """Asyncio front end for DatabaseManager.
+
+    Database calls run on a bounded thread pool over a pooled DatabaseManager,
+    so the event loop never blocks on MySQL. bcrypt hashing and verification
+    run in a process pool, and at most ``max_hash_jobs`` of them may be in
+    flight at once; further callers wait instead of piling up work.
+
+    Any object with the DatabaseManager interface can be passed as ``manager``
+    (for example one pointed at a local test server).
+    """
+
+    def __init__(self, pool_size: int = 10, hash_workers: Optional[int] = None,
+                 max_hash_jobs: Optional[int] = None, pool_timeout: float = 30.0,
+                 manager: Optional[DatabaseManager] = None):
+        self.manager = manager or DatabaseManager(pool_size=pool_size, pool_timeout=pool_timeout)
+        self._db_executor = futures.ThreadPoolExecutor(max_workers=max(1, pool_size),
+                                                       thread_name_prefix="db")
+        self._hash_executor = futures.ProcessPoolExecutor(max_workers=hash_workers)
+        self.max_hash_jobs = max_hash_jobs or 2 * (hash_workers or os.cpu_count() or 1)
+        self._hash_slots = None
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_executor, functools.partial(func, *args, **kwargs))
+
+    async def _run_hash_job(self, op: str, func, *args):
+        if self._hash_slots is None:
+            # Created lazily so it belongs to the running event loop
+            self._hash_slots = asyncio.Semaphore(self.max_hash_jobs)
+        start = time.perf_counter()
+        async with self._hash_slots:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._hash_executor, func, *args)
+            finally:
+                # Includes time queued behind the backpressure limit
+                if self.manager.instrumentation.enabled:
+                    self.manager.instrumentation.record(op, time.perf_counter() - start)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def connect_to_mysql(self, password: str, host: str = "localhost", user: str = "root",
+                               port: int = 3306) -> bool:
+        return await self._run(self.manager.connect_to_mysql, password, host, user, port)
+
+    async def get_all_databases(self) -> List[str]:
+        return await self._run(self.manager.get_all_databases)
+
+    async def select_database(self, db_name: str) -> bool:
+        return await self._run(self.manager.select_database, db_name)
+
+    async def create_database(self, purpose: str) -> bool:
+        return await self._run(self.manager.create_database, purpose)
+
+    async def create_tables(self) -> bool:
+        return await self._run(self.manager.create_tables)
+
+    async def migrate(self, online: bool = True) -> bool:
+        return await self._run(self.manager.migrate, online)
+
+    async def hash_password(self, password: str) -> str:
+        """Hash a password in the process pool."""
+        return await self._run_hash_job('hash_password', _hash_password, password, self.manager.bcrypt_rounds)
+
+    async def verify_password(self, entered_password: str, stored_password: str) -> bool:
+        """Verify a password against a stored hash in the process pool."""
+        return await self._run_hash_job('verify_password', _check_password, entered_password, stored_password)
+
+    async def authenticate(self, username: str, password: str) -> Optional[int]:
+        """Async version of DatabaseManager.authenticate; bcrypt runs in the process pool."""
+        cache = self.manager.auth_cache
+        start = time.perf_counter()
+        try:
+            try:
+                credentials = await self._run(self.manager._lookup_credentials, username)
+            except mysql.connector.Error as err:
+                print(f"Error authenticating: {err}")
+                return None
+            if credentials is None:
+                return None
+
+            login_id, user_id, stored_password = credentials
+            key = cache.key(username, password, stored_password)
+            if cache.get(key):
+                return user_id
+            if await self.verify_password(password, stored_password):
+                if self.manager.needs_rehash(stored_password):
+                    new_hash = await self.hash_password(password)
+                    if await self._run(self.manager._replace_hash, login_id, stored_password, new_hash):
+                        key = cache.key(username, password, new_hash)
+                cache.put(key, user_id, login_id)
+                return user_id
+            return None
+        finally:
+            cache.record_latency(time.perf_counter() - start)
+
+    async def insert_user(self, first_name: str, last_name: str, email: str, access_level: str) -> Optional[int]:
+        return await self._run(self.manager.insert_user, first_name, last_name, email, access_level)
+
+    async def insert_login(self, user_id: int, username: str, password: str) -> bool:
+        hashed_password = await self.hash_password(password)
+        return await self._run(self.manager.insert_login, user_id, username, None,
+                               hashed_password=hashed_password)
+
+    async def select_all_users(self) -> List[Dict]:
+        return await self._run(self.manager.select_all_users)
+
+    async def select_users_page(self, after_id: int = 0, limit: int = 50) -> List[Dict]:
+        return await self._run(self.manager.select_users_page, after_id, limit)
+
+    async def search_users(self, email: str = None, name_prefix: str = None, access_level: str = None,
+                           after_id: int = 0, limit: int = 50) -> List[Dict]:
+        return await self._run(self.manager.search_users, email, name_prefix, access_level, after_id, limit)
+
+    async def count_users(self, email: str = None, name_prefix: str = None, access_level: str = None) -> int:
+        return await self._run(self.manager.count_users, email, name_prefix, access_level)
+
+    async def select_user_by_id(self, user_id: int) -> Optional[Dict]:
+        return await self._run(self.manager.select_user_by_id, user_id)
+
+    async def select_login_by_username(self, username: str) -> Optional[Dict]:
+        return await self._run(self.manager.select_login_by_username, username)
+
+    async def update_user(self, user_id: int, first_name: str = None, last_name: str = None,
+                          email: str = None, access_level: str = None) -> bool:
+        return await self._run(self.manager.update_user, user_id, first_name, last_name, email, access_level)
+
+    async def update_users(self, updates: Iterable[Dict]) -> Dict:
+        return await self._run(self.manager.update_users, list(updates))
+
+    async def update_login(self, user_id: int, username: str = None, password: str = None) -> bool:
+        hashed_password = await self.hash_password(password) if password is not None else None
+        return await self._run(self.manager.update_login, user_id, username,
+                               hashed_password=hashed_password)
+
+    async def delete_user(self, user_id: int) -> bool:
+        return await self._run(self.manager.delete_user, user_id)
+
+    async def delete_login(self, login_id: int) -> bool:
+        return await self._run(self.manager.delete_login, login_id)
+
+    async def delete_users(self, user_ids: Iterable[int] = None, access_level: str = None,
+                           email_domain: str = None, chunk_size: int = DELETE_CHUNK_SIZE) -> Dict:
+        user_ids = list(user_ids) if user_ids is not None else None
+        return await self._run(self.manager.delete_users, user_ids, access_level, email_domain, chunk_size)
+
+    async def delete_logins(self, login_ids: Iterable[int], chunk_size: int = DELETE_CHUNK_SIZE) -> Dict:
+        return await self._run(self.manager.delete_logins, list(login_ids), chunk_size)
+
+    def pool_stats(self) -> Dict:
+        """Return connection pool metrics plus the bcrypt backpressure limit."""
+        stats = dict(self.manager.pool_stats())
+        stats['max_hash_jobs'] = self.max_hash_jobs
+        return stats
+
+    async def close(self):
+        """Close the connection pool and shut down both executors."""
+        await self._run(self.manager.close_connection)
+        self._db_executor.shutdown(wait=True)
+        self._hash_executor.shutdown(wait=True)
+
+
 def clear_screen():
     """Clear the console screen."""
     os.system('cls' if os.name == 'nt' else 'clear')
@@ -354,8 +3575,46 @@ def display_menu():
     print("6. Update login information")
     print("7. Delete user")
     print("8. Delete login")
-    print("9. Exit")
-    return input("Enter your choice (1-9): ")
+    print("9. Bulk import users from CSV/JSONL file")
+    print("10. Test login (authenticate)")
+    print("11. Calibrate password hashing cost")
+    print("12. Search users")
+    print("13. Bulk delete users")
+    print("14. Show performance statistics")
+    print("15. Exit")
+    return input("Enter your choice (1-15): ")
+
+
+def print_performance_stats(db_manager: DatabaseManager):
+    """Print a per-operation latency and round-trip table."""
+    stats = db_manager.performance_stats()
+    operations = stats['operations']
+    if not operations:
+        print("No operations recorded yet.")
+        return
+    print(f"{'Operation':<26} {'Calls':>7} {'Avg ms':>9} {'p99 ms':>9} {'MySQL ms':>10} {'Trips':>7} {'Rows':>8} {'Commits':>8}")
+    print("-" * 92)
+    for op, op_stats in operations.items():
+        print(f"{op:<26} {op_stats['count']:>7} {op_stats['avg_ms']:>9.2f} {op_stats['p99_ms']:>9.1f} "
+              f"{op_stats['db_ms']:>10.1f} {op_stats['round_trips']:>7} {op_stats['rows']:>8} {op_stats['commits']:>8}")
+    print(f"\nTime in bcrypt: {stats['bcrypt_ms']:.1f} ms   Time waiting on MySQL: {stats['mysql_ms']:.1f} ms")
+    cache = stats['user_cache']
+    if cache:
+        print(f"User cache ({cache['backend']}): {cache['size']} entries, hit ratio {cache['hit_ratio']:.1%}, "
+              f"{cache['evictions']} evictions, ~{cache['memory_bytes'] / 1024:.0f} KB")
+    statements = stats['statements']
+    if statements['enabled']:
+        print(f"Prepared statements: {statements['prepares']} prepared, {statements['executes']} executed, "
+              f"reuse {statements['reuse_ratio']:.1%}")
+    routing = stats['routing']
+    if routing:
+        print(f"\nRead routing ({routing['strategy']}, max lag {routing['max_lag']:g}s): "
+              f"{routing['pinned_reads']} pinned to primary, {routing['fallback_reads']} fell back to primary")
+        for endpoint in routing['endpoints']:
+            lag = f"{endpoint['lag']:.0f}s" if endpoint['lag'] is not None else "n/a"
+            state = "in rotation" if endpoint['admitted'] else "ejected"
+            print(f"  {endpoint['endpoint']:<24} {endpoint['role']:<8} {endpoint['queries']:>8} queries   "
+                  f"lag {lag:>5}   {state}")
 
 
 def get_user_input() -> Dict:
@@ -388,16 +3647,18 @@ def get_login_input() -> Dict:
     }
 
 
-def main():
-    """Main function to run the database management system."""
+def run_interactive():
+    """Run the interactive, menu-driven database management system."""
     # Get MySQL password
     mysql_password = getpass("Enter your MySQL root password: ")
     
     # Initialize database manager
-    db_manager = DatabaseManager()
+    settings = load_settings()
+    db_manager = DatabaseManager(bcrypt_rounds=settings.get('bcrypt_rounds'), replicas=env_replicas())
     
-    # Connect to MySQL
-    if not db_manager.connect_to_mysql(mysql_password):
+    # Connect to MySQL (the primary, when MYSQL_REPLICAS lists read replicas)
+    if not db_manager.connect_to_mysql(mysql_password, os.environ.get('MYSQL_HOST', "localhost"),
+                                       port=int(os.environ.get('MYSQL_TCP_PORT', 3306))):
         print("Failed to connect to MySQL. Exiting...")
         return
     
@@ -416,8 +3677,6 @@ def main():
             if 1 <= choice <= len(databases):
                 selected_db = databases[choice - 1]
                 if db_manager.select_database(selected_db):
-                    # Check if tables exist, create them if not
-                    db_manager.create_tables()
                     break
             elif choice == len(databases) + 1:
                 # Create new database
@@ -425,7 +3684,6 @@ def main():
                 purpose = input("Enter database name: ")
                 
                 if db_manager.create_database( purpose):
-                    db_manager.create_tables()
                     break
                 else:
                     print("Failed to create database. Please try again.")
@@ -434,6 +3692,23 @@ def main():
         except ValueError:
             print("Please enter a valid number")
     
+    # Create tables / apply pending migrations (no DDL when current)
+    if not db_manager.migrate():
+        if db_manager.blocked_by_duplicate_emails():
+            print(f"\nWarning: '{db_manager.db_name}' has duplicate emails, so the unique email index is "
+                  f"missing and new duplicates won't be rejected. Continuing; make the emails listed above "
+                  f"unique and start again to finish the migration.")
+        else:
+            latest = SCHEMA_MIGRATIONS[-1][0]
+            try:
+                version = db_manager.schema_version()
+            except mysql.connector.Error:
+                version = "unknown"
+            print(f"\nThe schema of '{db_manager.db_name}' could not be brought up to date "
+                  f"(at version {version} of {latest}). Fix the problem above and start again.")
+            db_manager.close_connection()
+            return
+    
     # Main program loop
     while True:
         choice = display_menu()
@@ -442,33 +3717,41 @@ def main():
             clear_screen()
             print("\n=== Add New User and Login ===")
             user_data = get_user_input()
-            user_id = db_manager.insert_user(
+            login_data = get_login_input()
+            # One transaction, so a rejected login doesn't leave a User row behind
+            db_manager.create_user_with_login(
                 user_data['first_name'],
                 user_data['last_name'],
                 user_data['email'],
-                user_data['access_level']
+                user_data['access_level'],
+                login_data['username'],
+                login_data['password']
             )
-            
-            if user_id:
-                login_data = get_login_input()
-                db_manager.insert_login(
-                    user_id,
-                    login_data['username'],
-                    login_data['password']
-                )
         
         elif choice == '2':  # View all users
             clear_screen()
             print("\n=== All Users ===")
-            users = db_manager.select_all_users()
-            if users:
+            # Page through the table by userId so large tables never load at once
+            last_id = 0
+            page_number = 1
+            while True:
+                users = db_manager.select_users_page(last_id, PAGE_SIZE)
+                if not users:
+                    print("No users found." if page_number == 1 else "No more users.")
+                    input("\nPress Enter to continue...")
+                    break
+                print(f"\n--- Page {page_number} ---")
                 print(f"{'ID':<5} {'First Name':<15} {'Last Name':<15} {'Email':<30} {'Access Level':<10}")
                 print("-" * 75)
                 for user in users:
                     print(f"{user['userId']:<5} {user['firstName']:<15} {user['lastName']:<15} {user['email']:<30} {user['accessLevel']:<10}")
-            else:
-                print("No users found.")
-            input("\nPress Enter to continue...")
+                if len(users) < PAGE_SIZE:
+                    input("\nPress Enter to continue...")
+                    break
+                if input("\nPress Enter for the next page or 'q' to return to the menu: ").lower() == 'q':
+                    break
+                last_id = users[-1]['userId']
+                page_number += 1
         
         elif choice == '3':  # Find user by ID
             clear_screen()
@@ -561,7 +3844,134 @@ def main():
                 print("Invalid ID. Please enter a number.")
             input("\nPress Enter to continue...")
         
-        elif choice == '9':  # Exit
+        elif choice == '9':  # Bulk import
+            clear_screen()
+            print("\n=== Bulk Import Users ===")
+            path = input("Path to CSV or JSONL file: ")
+            if os.path.isfile(path):
+                reject_path = input(f"Reject file [{path}.rejects.jsonl]: ") or f"{path}.rejects.jsonl"
+                try:
+                    batch_size = int(input(f"Rows per transaction [{IMPORT_BATCH_SIZE}]: ") or IMPORT_BATCH_SIZE)
+                except ValueError:
+                    batch_size = IMPORT_BATCH_SIZE
+                db_manager.import_users(read_import_file(path), batch_size=batch_size, reject_path=reject_path)
+            else:
+                print(f"File not found: {path}")
+            input("\nPress Enter to continue...")
+        
+        elif choice == '10':  # Test login
+            clear_screen()
+            print("\n=== Test Login ===")
+            login_data = get_login_input()
+            user_id = db_manager.authenticate(login_data['username'], login_data['password'])
+            if user_id is not None:
+                print(f"Login successful for user ID {user_id}.")
+            else:
+                print("Invalid username or password.")
+            stats = db_manager.auth_stats()
+            print(f"Auth cache: {stats['hits']} hits / {stats['misses']} misses, "
+                  f"p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms")
+            input("\nPress Enter to continue...")
+        
+        elif choice == '11':  # Calibrate bcrypt cost
+            clear_screen()
+            print("\n=== Calibrate Password Hashing Cost ===")
+            try:
+                target_ms = float(input("Target time per hash in ms [250]: ") or 250)
+                print("Benchmarking bcrypt...")
+                rounds = calibrate_bcrypt_cost(target_ms)
+                db_manager.bcrypt_rounds = rounds
+                settings['bcrypt_rounds'] = rounds
+                save_settings(settings)
+                print(f"Using bcrypt cost {rounds} for new passwords (saved to {SETTINGS_FILE}).")
+                print("Existing passwords are rehashed at this cost on their next successful login.")
+            except ValueError:
+                print("Invalid number.")
+            except OSError as err:
+                print(f"Could not save settings: {err}")
+            input("\nPress Enter to continue...")
+        
+        elif choice == '12':  # Search users
+            clear_screen()
+            print("\n=== Search Users ===")
+            print("Leave a field empty to ignore it.")
+            email = input("Email (exact): ") or None
+            name_prefix = input("First or last name starts with: ") or None
+            access_level = input("Access level (basic/admin): ").lower() or None
+            if access_level is not None and access_level not in ['basic', 'admin']:
+                print("Invalid access level; ignoring it.")
+                access_level = None
+
+            if input("Show query plan (EXPLAIN)? (y/n): ").lower() == 'y':
+                for step in db_manager.explain_search(email, name_prefix, access_level, limit=PAGE_SIZE):
+                    if 'detail' in step:
+                        print(f"{step['query']}: {step['detail']}")
+                    else:
+                        print(f"{step['query']}: table={step.get('table')} type={step.get('type')} "
+                              f"key={step.get('key')} rows={step.get('rows')} extra={step.get('Extra')}")
+                    if step['full_scan']:
+                        print("  WARNING: this search scans the whole table.")
+
+            total = db_manager.count_users(email, name_prefix, access_level)
+            print(f"\n{total} matching user(s).")
+            last_id = 0
+            while total:
+                users = db_manager.search_users(email, name_prefix, access_level, last_id, PAGE_SIZE)
+                if not users:
+                    break
+                print(f"{'ID':<5} {'First Name':<15} {'Last Name':<15} {'Email':<30} {'Access Level':<10}")
+                print("-" * 75)
+                for user in users:
+                    print(f"{user['userId']:<5} {user['firstName']:<15} {user['lastName']:<15} {user['email']:<30} {user['accessLevel']:<10}")
+                if len(users) < PAGE_SIZE or input("\nPress Enter for more or 'q' to stop: ").lower() == 'q':
+                    break
+                last_id = users[-1]['userId']
+            input("\nPress Enter to continue...")
+        
+        elif choice == '13':  # Bulk delete users
+            clear_screen()
+            print("\n=== Bulk Delete Users ===")
+            print("1. User IDs from a file")
+            print("2. By access level and/or email domain")
+            mode = input("Choose (1-2): ")
+            if mode == '1':
+                path = input("Path to ID file (one ID per line or CSV): ")
+                if not os.path.isfile(path):
+                    print(f"File not found: {path}")
+                elif input(f"Delete every user listed in {path} with their logins? (y/n): ").lower() == 'y':
+                    db_manager.delete_users(read_id_file(path))
+            elif mode == '2':
+                access_level = input("Access level (basic/admin, empty = any): ").lower() or None
+                email_domain = input("Email domain, e.g. example.com (empty = any): ") or None
+                if access_level is not None and access_level not in ['basic', 'admin']:
+                    print("Invalid access level.")
+                elif access_level is None and email_domain is None:
+                    print("At least one filter is required.")
+                else:
+                    matched = db_manager.count_users(access_level=access_level) if email_domain is None else None
+                    preview = f"{matched} user(s)" if matched is not None else "all matching users"
+                    if input(f"Delete {preview} and their logins? (y/n): ").lower() == 'y':
+                        db_manager.delete_users(access_level=access_level, email_domain=email_domain)
+            else:
+                print("Invalid choice.")
+            input("\nPress Enter to continue...")
+        
+        elif choice == '14':  # Performance statistics
+            clear_screen()
+            print("\n=== Performance Statistics ===")
+            print_performance_stats(db_manager)
+            path = input("\nExport to file (.json or .prom, empty to skip): ")
+            if path:
+                fmt = 'prometheus' if path.endswith(('.prom', '.txt')) else 'json'
+                try:
+                    with open(path, 'w', encoding='utf-8') as f:
+                        f.write(db_manager.export_stats(fmt))
+                    print(f"Statistics written to {path}")
+                except OSError as err:
+                    print(f"Could not write {path}: {err}")
+            input("\nPress Enter to continue...")
+        
+        elif choice == '15':  # Exit
             db_manager.close_connection()
             print("Thank you for using the User Management System. Goodbye!")
             break
@@ -570,5 +3980,423 @@ def main():
             print("Invalid choice. Please try again.")
 
 
+# ---------------------------------------------------------------------------
+# Non-interactive command line interface
+# ---------------------------------------------------------------------------
+
+def load_connection_options(args: argparse.Namespace) -> Dict:
+    """Resolve connection settings: command line, then environment, then option file.
+
+    The option file is a MySQL-style INI file (e.g. ~/.my.cnf) whose [client]
+    section may set host, port, user, password and database. Environment
+    variables follow the mysql client: MYSQL_HOST, MYSQL_TCP_PORT, MYSQL_USER,
+    MYSQL_PWD, plus MYSQL_DATABASE.
+    """
+    options = {'host': "localhost", 'port': 3306, 'user': "root", 'password': None, 'database': None}
+    if args.defaults_file:
+        parser = configparser.ConfigParser()
+        if not parser.read(os.path.expanduser(args.defaults_file)):
+            raise SystemExit(f"Option file not found: {args.defaults_file}")
+        if parser.has_section('client'):
+            for key in options:
+                if parser.has_option('client', key):
+                    options[key] = parser.get('client', key).strip('"\'')
+    env = {'host': 'MYSQL_HOST', 'port': 'MYSQL_TCP_PORT', 'user': 'MYSQL_USER',
+           'password': 'MYSQL_PWD', 'database': 'MYSQL_DATABASE'}
+    for key, var in env.items():
+        if os.environ.get(var):
+            options[key] = os.environ[var]
+    for key in options:
+        value = getattr(args, key, None)
+        if value is not None:
+            options[key] = value
+    options['port'] = int(options['port'])
+    return options
+
+
+def env_replicas() -> List[str]:
+    """Read replica endpoints from MYSQL_REPLICAS ('host:port,host:port')."""
+    return [host.strip() for host in os.environ.get('MYSQL_REPLICAS', '').split(',') if host.strip()]
+
+
+def connect_from_args(args: argparse.Namespace) -> Optional[DatabaseManager]:
+    """Create, connect and migrate a DatabaseManager for a CLI invocation."""
+    options = load_connection_options(args)
+    backend = SQLiteBackend(args.sqlite) if args.sqlite else None
+    if backend is not None:
+        # The file is the whole database; no server or credentials involved
+        options.update({'database': 'main', 'password': ''})
+    # A tenant sweep addresses every database itself and never migrates
+    sweep = args.command == 'tenants'
+    if not options['database'] and not sweep:
+        print("No database given (use --database or MYSQL_DATABASE).", file=sys.stderr)
+        return None
+    password = options['password']
+    if password is None:
+        password = getpass("Enter your MySQL password: ") if sys.stdin.isatty() else ""
+
+    replicas = args.replica or env_replicas()
+    if replicas and backend is not None:
+        print("Replicas can't be used with --sqlite.", file=sys.stderr)
+        return None
+
+    settings = load_settings()
+    db_manager = DatabaseManager(bcrypt_rounds=settings.get('bcrypt_rounds'), backend=backend, replicas=replicas,
+                                 read_strategy=args.read_strategy, max_replica_lag=args.max_replica_lag)
+    if not db_manager.connect_to_mysql(password, options['host'], options['user'], options['port'],
+                                       database=options['database']):
+        return None
+    if sweep:
+        return db_manager
+    # A schema found current by an earlier run needs no check, let alone DDL
+    if backend is not None:
+        schema_key = f"sqlite:{os.path.abspath(args.sqlite)}"
+    else:
+        schema_key = f"{options['user']}@{options['host']}:{options['port']}/{options['database']}"
+    known_versions = settings.setdefault('schema_versions', {})
+    if schema_key in known_versions and not args.recheck_schema:
+        db_manager.schema_versions[options['database']] = known_versions[schema_key]
+    if not db_manager.migrate():
+        if not db_manager.blocked_by_duplicate_emails():
+            db_manager.close_connection()
+            return None
+        # Nothing is cached, so the next run retries the unique email index
+        print("Warning: duplicate emails keep the unique email index from being built; continuing without it.",
+              file=sys.stderr)
+        return db_manager
+    version = db_manager.schema_versions.get(options['database'])
+    if known_versions.get(schema_key) != version:
+        known_versions[schema_key] = version
+        try:
+            save_settings(settings)
+        except OSError:
+            pass
+    return db_manager
+
+
+class OutputWriter:
+    """Writes result records to stdout as JSON lines or CSV."""
+
+    def __init__(self, stream, fmt: str = 'json', fields: List[str] = None):
+        self.stream = stream
+        self.fmt = fmt
+        self.fields = fields
+        self._csv = None
+
+    def write(self, record: Dict):
+        if self.fmt == 'csv':
+            if self._csv is None:
+                self._csv = csv.DictWriter(self.stream, fieldnames=self.fields or list(record),
+                                           extrasaction='ignore')
+                self._csv.writeheader()
+            self._csv.writerow(record)
+        else:
+            self.stream.write(json.dumps(record, default=str) + "\n")
+
+
+def _login_password(args: argparse.Namespace) -> Optional[str]:
+    """Password for a new login: MSDB_LOGIN_PASSWORD, otherwise a prompt on a terminal."""
+    password = os.environ.get('MSDB_LOGIN_PASSWORD')
+    if password is None and sys.stdin.isatty():
+        password = getpass(f"Password for {args.username}: ")
+    return password
+
+
+def execute_command(db_manager: DatabaseManager, command: Dict) -> Dict:
+    """Execute one JSON command (as used by batch mode) and return a result record.
+
+    Supported ops: add, get, update, update_login, delete, delete_login,
+    authenticate. Field names match the DatabaseManager keyword arguments.
+    """
+    op = command.get('op')
+    if op == 'add':
+        if command.get('username'):
+            user_id = db_manager.create_user_with_login(command['first_name'], command['last_name'],
+                                                        command['email'], command.get('access_level', 'basic'),
+                                                        command['username'], command['password'])
+        else:
+            user_id = db_manager.insert_user(command['first_name'], command['last_name'], command['email'],
+                                             command.get('access_level', 'basic'))
+        return {'ok': user_id is not None, 'userId': user_id}
+    if op == 'get':
+        if 'username' in command:
+            login = db_manager.select_login_by_username(command['username'])
+            if login:
+                login.pop('password', None)
+            return {'ok': login is not None, 'result': login}
+        user = db_manager.select_user_by_id(command['user_id'])
+        return {'ok': user is not None, 'result': user}
+    if op == 'update':
+        ok = db_manager.update_user(command['user_id'], command.get('first_name'), command.get('last_name'),
+                                    command.get('email'), command.get('access_level'))
+        return {'ok': ok, 'status': db_manager.last_call_stats().get('status')}
+    if op == 'update_login':
+        return {'ok': db_manager.update_login(command['user_id'], command.get('username'),
+                                              command.get('password'))}
+    if op == 'delete':
+        return {'ok': db_manager.delete_user(command['user_id'])}
+    if op == 'delete_login':
+        return {'ok': db_manager.delete_login(command['login_id'])}
+    if op == 'authenticate':
+        user_id = db_manager.authenticate(command['username'], command['password'])
+        return {'ok': user_id is not None, 'userId': user_id}
+    return {'ok': False, 'error': f"unknown op '{op}'"}
+
+
+def run_batch(db_manager: DatabaseManager, lines: Iterable[str], writer: OutputWriter,
+              batch_size: int = 500) -> int:
+    """Execute a JSONL command stream, committing every ``batch_size`` commands.
+
+    Each command runs in its own savepoint, so a failing command is undone
+    without discarding the rest of its chunk. Returns the number of failed
+    commands.
+    """
+    failures = 0
+    for chunk in _chunked(enumerate(lines, 1), batch_size):
+        results = []
+        try:
+            with db_manager.transaction():
+                for line_no, line in chunk:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        command = json.loads(line)
+                        with db_manager.savepoint("batch_command"):
+                            result = execute_command(db_manager, command)
+                        result['op'] = command.get('op')
+                    except mysql.connector.Error as err:
+                        result = {'ok': False, 'op': command.get('op'), 'error': f"rolled back: {err}"}
+                    except (ValueError, KeyError, TypeError, AttributeError) as err:
+                        result = {'ok': False, 'error': f"{type(err).__name__}: {err}"}
+                    result['line'] = line_no
+                    results.append(result)
+        except mysql.connector.Error as err:
+            # The transaction was rolled back, so nothing in this chunk took effect
+            for result in results:
+                result.update({'ok': False, 'error': f"transaction rolled back: {err}"})
+        for result in results:
+            failures += not result['ok']
+            writer.write(result)
+    return failures
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="MySecureDBManager",
+        description="Manage the User/Login database. Run without arguments for the interactive menu."
+    )
+    parser.add_argument('--host', help="MySQL host (env MYSQL_HOST, default localhost)")
+    parser.add_argument('--port', type=int, help="MySQL port (env MYSQL_TCP_PORT, default 3306)")
+    parser.add_argument('--user', help="MySQL user (env MYSQL_USER, default root)")
+    parser.add_argument('--database', '-D', help="database to use (env MYSQL_DATABASE)")
+    parser.add_argument('--defaults-file', help="MySQL option file with a [client] section")
+    parser.add_argument('--sqlite', metavar='PATH',
+                        help="use an embedded SQLite database file instead of a MySQL server")
+    parser.add_argument('--replica', action='append', metavar='HOST[:PORT]',
+                        help="read replica of the server (repeatable; env MYSQL_REPLICAS, comma-separated)")
+    parser.add_argument('--read-strategy', choices=READ_STRATEGIES, default='round_robin',
+                        help="how reads are spread over replicas")
+    parser.add_argument('--max-replica-lag', type=float, default=5.0,
+                        help="seconds behind the primary before a replica is taken out of rotation")
+    parser.add_argument('--format', choices=['json', 'csv'], default='json', help="output format")
+    parser.add_argument('--quiet', '-q', action='store_true', help="suppress progress messages on stderr")
+    parser.add_argument('--recheck-schema', action='store_true',
+                        help="check the schema version even if an earlier run found it current")
+    subparsers = parser.add_subparsers(dest='command')
+
+    add = subparsers.add_parser('add', help="add a user (and optionally a login)")
+    add.add_argument('--first-name', required=True)
+    add.add_argument('--last-name', required=True)
+    add.add_argument('--email', required=True)
+    add.add_argument('--access-level', choices=['basic', 'admin'], default='basic')
+    add.add_argument('--username', help="also create a login; password from MSDB_LOGIN_PASSWORD or prompt")
+
+    list_cmd = subparsers.add_parser('list', help="list users")
+    list_cmd.add_argument('--after-id', type=int, default=0, help="start after this userId")
+    list_cmd.add_argument('--limit', type=int, help="maximum rows (default: all, streamed)")
+    list_cmd.add_argument('--email')
+    list_cmd.add_argument('--name-prefix')
+    list_cmd.add_argument('--access-level', choices=['basic', 'admin'])
+
+    get = subparsers.add_parser('get', help="get a user by ID or a login by username")
+    get_target = get.add_mutually_exclusive_group(required=True)
+    get_target.add_argument('--id', type=int, dest='user_id')
+    get_target.add_argument('--username')
+
+    update = subparsers.add_parser('update', help="update a user")
+    update.add_argument('user_id', type=int)
+    update.add_argument('--first-name')
+    update.add_argument('--last-name')
+    update.add_argument('--email')
+    update.add_argument('--access-level', choices=['basic', 'admin'])
+
+    delete = subparsers.add_parser('delete', help="delete users (and their logins)")
+    delete.add_argument('user_ids', type=int, nargs='*')
+    delete.add_argument('--ids-file', help="file of user IDs, one per line")
+    delete.add_argument('--access-level', choices=['basic', 'admin'])
+    delete.add_argument('--email-domain')
+
+    import_cmd = subparsers.add_parser('import', help="bulk import users and logins from CSV/JSONL")
+    import_cmd.add_argument('path')
+    import_cmd.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    import_cmd.add_argument('--reject-file')
+    import_cmd.add_argument('--workers', type=int)
+
+    export = subparsers.add_parser('export', help="export users joined with logins (no passwords)")
+    export.add_argument('--output', '-o', help="output file (default stdout); .gz compresses")
+    export.add_argument('--type', choices=['csv', 'jsonl', 'parquet'],
+                        help="file format (default from the output extension, else jsonl)")
+    export.add_argument('--since-id', type=int, default=0, help="only users with a greater userId")
+    export.add_argument('--state-file', help="incremental export: read/advance the userId high-water mark here")
+    export.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE)
+
+    batch = subparsers.add_parser('batch', help="run JSONL commands from stdin (or a file)")
+    batch.add_argument('path', nargs='?', help="command file (default stdin)")
+    batch.add_argument('--batch-size', type=int, default=500, help="commands per transaction")
+
+    tenants = subparsers.add_parser('tenants', help="run a read-only check across tenant databases in parallel")
+    tenants.add_argument('operation', choices=sorted(TENANT_OPERATIONS))
+    tenants.add_argument('--match', help="only databases matching this glob, e.g. 'tenant_*'")
+    tenants.add_argument('--workers', type=int, default=8, help="concurrent connections")
+    tenants.add_argument('--min-cost', type=int, default=12,
+                         help="password_audit: count hashes below this bcrypt cost")
+    return parser
+
+
+def run_cli(args: argparse.Namespace) -> int:
+    """Run one non-interactive subcommand. Returns the process exit code."""
+    out = sys.stdout
+    # Manager methods report progress with print(); keep stdout for results only
+    log = open(os.devnull, 'w') if args.quiet else sys.stderr
+    try:
+        with contextlib.redirect_stdout(log):
+            db_manager = connect_from_args(args)
+            if db_manager is None:
+                return 2
+            try:
+                return _dispatch_cli(db_manager, args, out)
+            finally:
+                db_manager.close_connection()
+    finally:
+        if args.quiet:
+            log.close()
+
+
+def _dispatch_cli(db_manager: DatabaseManager, args: argparse.Namespace, out) -> int:
+    writer = OutputWriter(out, args.format)
+    if args.command == 'add':
+        command = {'op': 'add', 'first_name': args.first_name, 'last_name': args.last_name,
+                   'email': args.email, 'access_level': args.access_level}
+        if args.username:
+            password = _login_password(args)
+            if not password:
+                print("A login password is required (MSDB_LOGIN_PASSWORD or prompt).", file=sys.stderr)
+                return 1
+            command.update({'username': args.username, 'password': password})
+        result = execute_command(db_manager, command)
+        writer.write(result)
+        return 0 if result['ok'] else 1
+
+    if args.command == 'tenants':
+        op_kwargs = {'min_cost': args.min_cost} if args.operation == 'password_audit' else {}
+        start = time.perf_counter()
+        swept = failed = 0
+        for record in db_manager.fan_out(args.operation, match=args.match, workers=args.workers, **op_kwargs):
+            swept += 1
+            failed += not record['ok']
+            writer.write(record)
+        print(f"Swept {swept} tenant databases in {time.perf_counter() - start:.1f}s ({failed} failed).")
+        return 1 if failed else 0
+
+    if args.command == 'export':
+        fmt = args.type
+        if fmt is None:
+            name = (args.output or '').lower().replace('.gz', '')
+            fmt = 'parquet' if name.endswith('.parquet') else 'csv' if name.endswith('.csv') else 'jsonl'
+        if fmt == 'parquet' and not args.output:
+            print("Parquet export needs --output.", file=sys.stderr)
+            return 1
+        stats = db_manager.export_users(args.output or out, fmt, args.since_id, args.state_file, args.batch_size)
+        # Keep stdout clean when it carries the export itself
+        OutputWriter(out if args.output else sys.stderr, 'json').write(stats)
+        return 1 if 'error' in stats else 0
+
+    if args.command == 'list':
+        # Keyset pages keep memory flat however large the table is
+        writer.fields = list(USER_COLUMNS)
+        after_id = args.after_id
+        remaining = args.limit
+        while remaining is None or remaining > 0:
+            page_size = min(remaining, 1000) if remaining is not None else 1000
+            users = db_manager.search_users(args.email, args.name_prefix, args.access_level,
+                                            after_id, page_size)
+            for user in users:
+                writer.write(user)
+            if len(users) < page_size:
+                break
+            after_id = users[-1]['userId']
+            if remaining is not None:
+                remaining -= len(users)
+        return 0
+
+    if args.command == 'get':
+        command = {'op': 'get', 'user_id': args.user_id} if args.user_id is not None \
+            else {'op': 'get', 'username': args.username}
+        result = execute_command(db_manager, command)
+        if result['ok']:
+            writer.write(result['result'])
+        return 0 if result['ok'] else 1
+
+    if args.command == 'update':
+        result = execute_command(db_manager, {'op': 'update', 'user_id': args.user_id,
+                                              'first_name': args.first_name, 'last_name': args.last_name,
+                                              'email': args.email, 'access_level': args.access_level})
+        writer.write(result)
+        return 0 if result['ok'] or result.get('status') == 'unchanged' else 1
+
+    if args.command == 'delete':
+        if args.user_ids or args.ids_file:
+            ids = list(args.user_ids)
+            if args.ids_file:
+                ids.extend(read_id_file(args.ids_file))
+            summary = db_manager.delete_users(ids)
+        elif args.access_level or args.email_domain:
+            summary = db_manager.delete_users(access_level=args.access_level, email_domain=args.email_domain)
+        else:
+            print("Nothing to delete: give user IDs, --ids-file or a filter.", file=sys.stderr)
+            return 1
+        writer.write(summary)
+        return 0
+
+    if args.command == 'import':
+        stats = db_manager.import_users(read_import_file(args.path), batch_size=args.batch_size,
+                                        workers=args.workers, reject_path=args.reject_file)
+        writer.write(stats)
+        return 0 if stats['rejected'] == 0 else 1
+
+    if args.command == 'batch':
+        if args.path:
+            with open(args.path, encoding='utf-8') as f:
+                failures = run_batch(db_manager, f, writer, args.batch_size)
+        else:
+            failures = run_batch(db_manager, sys.stdin, writer, args.batch_size)
+        return 0 if failures == 0 else 1
+    return 2
+
+
+def main(argv: List[str] = None) -> int:
+    """Entry point: interactive menu without arguments, otherwise a subcommand."""
+    args = build_arg_parser().parse_args(argv)
+    if args.command is None:
+        run_interactive()
+        return 0
+    return run_cli(args)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Needed for the bcrypt process pool in the PyInstaller-built executable
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+    sys.exit(main())
\ No newline at end of file
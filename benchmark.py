@@ -0,0 +1,414 @@
+"""Reproducible throughput/latency benchmark for MySecureDBManager.
+
+Seeds a dedicated database with the User/Login schema at a chosen scale, then
+drives each DatabaseManager operation from a pool of worker threads and
+reports throughput, p50/p95/p99 latency and peak RSS. Results can be saved as
+a baseline and later runs compared against it to flag regressions.
+
+Runs entirely against a local server, e.g.:
+
+    docker run -d -p 3306:3306 -e MYSQL_ROOT_PASSWORD=bench mysql:8
+    python benchmark.py --password bench --scale 10000 --concurrency 8 --save-baseline baseline.json
+    python benchmark.py --password bench --scale 10000 --concurrency 8 --baseline baseline.json
+
+or against the embedded SQLite backend (--backend sqlite), or both side by
+side (--backend both).
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from MySecureDBManager import USER_COLUMNS, DatabaseManager, SQLiteBackend, UserRecord, UserTable, _percentile
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Modules MySecureDBManager defers until first use; the "eager" startup case imports them up front
+DEFERRED_MODULES = ('mysql.connector', 'bcrypt', 'asyncio', 'concurrent.futures', 'sqlite3')
+
+OPERATIONS = ['insert', 'select_by_id', 'select_login', 'update', 'verify', 'authenticate', 'list_all', 'delete']
+
+# Cheap bcrypt cost for seeded rows; 'verify' measures the configured cost
+SEED_BCRYPT_ROUNDS = 4
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def seed(db_manager: DatabaseManager, scale: int, seed_value: int):
+    """Fill the benchmark database up to ``scale`` users with logins."""
+    existing = db_manager.count_users()
+    if existing >= scale:
+        print(f"Database already holds {existing} users; skipping seed.")
+        return
+    rng = random.Random(seed_value)
+
+    def rows():
+        for i in range(existing, scale):
+            yield {
+                'first_name': f"First{i}",
+                'last_name': f"Last{rng.randint(0, scale)}",
+                'email': f"bench{i}@example.com",
+                'access_level': 'admin' if i % 20 == 0 else 'basic',
+                'username': f"bench_user_{i}",
+                'password': f"password{i}",
+            }
+
+    print(f"Seeding {scale - existing} users...")
+    db_manager.import_users(rows(), batch_size=5000)
+
+
+def run_operation(name: str, op: Callable[[int], None], ops: int, concurrency: int) -> Dict:
+    """Run ``op(i)`` for i in range(ops) across ``concurrency`` threads and collect latencies."""
+    latencies: List[float] = []
+    lock = threading.Lock()
+    counter = iter(range(ops))
+
+    def worker():
+        local = []
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            op(i)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'ops': len(latencies),
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p95_ms': _percentile(latencies, 95) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def build_operations(db_manager: DatabaseManager, scale: int, seed_value: int, run_id: str) -> Dict:
+    """Return name -> (op(i), default op count multiplier) for every benchmarked operation."""
+    rng = random.Random(seed_value)
+    ids = [rng.randint(1, scale) for _ in range(100000)]
+    inserted: List[int] = []
+    inserted_lock = threading.Lock()
+
+    def pick(i: int) -> int:
+        return ids[i % len(ids)]
+
+    def insert(i):
+        user_id = db_manager.insert_user(f"New{i}", "Bench", f"new_{run_id}_{i}@example.com", 'basic')
+        if user_id:
+            db_manager.insert_login(user_id, f"new_{run_id}_{i}", f"password{i}")
+            with inserted_lock:
+                inserted.append(user_id)
+
+    def select_by_id(i):
+        db_manager.select_user_by_id(pick(i))
+
+    def select_login(i):
+        db_manager.select_login_by_username(f"bench_user_{pick(i) - 1}")
+
+    def update(i):
+        db_manager.update_user(pick(i), first_name=f"Upd{i}")
+
+    reference_hash = db_manager._encrypt_password("password")
+
+    def verify(i):
+        db_manager.verify_password("password", reference_hash)
+
+    def authenticate(i):
+        # Seeded user N has password N; clear the credential cache so every call is a miss
+        n = pick(i) - 1
+        db_manager.auth_cache.clear()
+        db_manager.authenticate(f"bench_user_{n}", f"password{n}")
+
+    def list_all(i):
+        for _ in db_manager.iter_users():
+            pass
+
+    def delete(i):
+        with inserted_lock:
+            user_id = inserted.pop() if inserted else None
+        if user_id:
+            db_manager.delete_user(user_id)
+
+    return {
+        'insert': (insert, 1.0),
+        'select_by_id': (select_by_id, 1.0),
+        'select_login': (select_login, 1.0),
+        'update': (update, 1.0),
+        'verify': (verify, 0.05),
+        'authenticate': (authenticate, 0.5),
+        'list_all': (list_all, 0.001),
+        'delete': (delete, 1.0),
+    }
+
+
+def row_format_benchmark(rows: int) -> Dict:
+    """Compare memory and build time of dict rows, UserRecord rows and a UserTable.
+
+    Runs offline on synthetic cursor tuples, so it measures only the Python
+    side of select_all_users.
+    """
+    rng = random.Random(0)
+    first_names = [f"First{i}" for i in range(500)]
+    last_names = [f"Last{i}" for i in range(2000)]
+    source = [(i, rng.choice(first_names), rng.choice(last_names), f"user{i}@example.com",
+               'admin' if i % 20 == 0 else 'basic') for i in range(1, rows + 1)]
+
+    builders = {
+        'dict': lambda: [dict(zip(USER_COLUMNS, row)) for row in source],
+        'record': lambda: [UserRecord._make(row) for row in source],
+        'columnar': lambda: _build_table(source),
+    }
+    results = {}
+    for name, build in builders.items():
+        # Keep collector pauses triggered by earlier runs out of the timing
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            build()
+            seconds = time.perf_counter() - start
+        finally:
+            gc.enable()
+        tracemalloc.start()
+        result = build()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        results[name] = {'seconds': seconds, 'peak_mb': peak / (1024 * 1024)}
+    return results
+
+
+def _build_table(source) -> UserTable:
+    table = UserTable()
+    table.extend(source)
+    return table
+
+
+def _import_time(code: str) -> Tuple[float, List[str]]:
+    """Run ``code`` in a fresh interpreter under -X importtime.
+
+    Returns the milliseconds spent importing everything after interpreter
+    start-up (``site``) and which DEFERRED_MODULES ended up loaded.
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=HERE,
+                          capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    total_us = 0
+    loaded = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, raw_name = line[len('import time:'):].split('|')
+        name = raw_name.strip()
+        if name in DEFERRED_MODULES:
+            loaded.append(name)
+        if raw_name.startswith('  '):
+            continue  # nested import, already counted in its parent's cumulative time
+        if name == 'site':
+            total_us = 0  # everything before this is interpreter start-up
+        else:
+            total_us += int(cumulative)
+    return total_us / 1000, loaded
+
+
+def startup_benchmark(runs: int) -> Dict:
+    """Median import cost of MySecureDBManager, lazily and with its deferred imports forced, plus CLI wall time."""
+    cases = {
+        'lazy import': "import MySecureDBManager",
+        'eager import': "import MySecureDBManager, " + ", ".join(DEFERRED_MODULES),
+    }
+    results = {}
+    for name, code in cases.items():
+        samples = [_import_time(code) for _ in range(runs)]
+        results[name] = {'ms': statistics.median(ms for ms, _ in samples), 'loaded': samples[-1][1]}
+    walls = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(HERE, 'MySecureDBManager.py'), '--help'],
+                       stdout=subprocess.DEVNULL, check=True)
+        walls.append((time.perf_counter() - start) * 1000)
+    results['cli --help (wall)'] = {'ms': statistics.median(walls), 'loaded': []}
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Return regression messages for operations that got slower than ``threshold`` percent."""
+    regressions = []
+    for name, result in results['operations'].items():
+        base = baseline.get('operations', {}).get(name)
+        if not base:
+            continue
+        if base['throughput'] and result['throughput'] < base['throughput'] * (1 - threshold / 100):
+            regressions.append(f"{name}: throughput {result['throughput']:.1f} ops/s "
+                               f"vs baseline {base['throughput']:.1f}")
+        if base['p99_ms'] and result['p99_ms'] > base['p99_ms'] * (1 + threshold / 100):
+            regressions.append(f"{name}: p99 {result['p99_ms']:.2f} ms vs baseline {base['p99_ms']:.2f}")
+    return regressions
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3306)
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default=os.environ.get('MYSQL_PWD', ''))
+    parser.add_argument('--database', default='mysecuredb_bench')
+    parser.add_argument('--backend', choices=['mysql', 'sqlite', 'both'], default='mysql',
+                        help="storage backend to benchmark; 'both' prints a per-operation comparison")
+    parser.add_argument('--sqlite-path', default='mysecuredb_bench.sqlite', help="database file for the SQLite backend")
+    parser.add_argument('--scale', type=int, default=10000, help="users to seed (e.g. 10000, 1000000)")
+    parser.add_argument('--ops', type=int, default=2000, help="operations per benchmark (scaled per op)")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--operations', default=','.join(OPERATIONS),
+                        help=f"comma-separated subset of {','.join(OPERATIONS)}")
+    parser.add_argument('--bcrypt-rounds', type=int, default=None,
+                        help="bcrypt cost for inserted/verified passwords (default: library default)")
+    parser.add_argument('--seed', type=int, default=42, help="random seed for reproducible key choice")
+    parser.add_argument('--baseline', help="compare against this saved result file")
+    parser.add_argument('--save-baseline', help="write results to this file")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="percent slowdown that counts as a regression")
+    parser.add_argument('--row-formats', type=int, metavar='ROWS',
+                        help="only compare dict/record/columnar row memory and CPU for ROWS rows (no database)")
+    parser.add_argument('--startup', type=int, metavar='RUNS',
+                        help="only measure import/CLI start-up time over RUNS fresh interpreters (no database)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.row_formats:
+        print(f"{'Row format':<12} {'Build s':>9} {'Peak MB':>9}   ({args.row_formats} rows)")
+        print("-" * 32)
+        for name, result in row_format_benchmark(args.row_formats).items():
+            print(f"{name:<12} {result['seconds']:>9.2f} {result['peak_mb']:>9.1f}")
+        return 0
+    if args.startup:
+        print(f"{'Start-up':<20} {'Median ms':>10}   Deferred modules loaded   ({args.startup} runs)")
+        print("-" * 64)
+        for name, result in startup_benchmark(args.startup).items():
+            print(f"{name:<20} {result['ms']:>10.1f}   {', '.join(result['loaded']) or '-'}")
+        return 0
+
+    names = [name.strip() for name in args.operations.split(',') if name.strip()]
+    unknown = set(names) - set(OPERATIONS)
+    if unknown:
+        print(f"Unknown operation(s): {', '.join(sorted(unknown))}")
+        return 2
+    backends = ['mysql', 'sqlite'] if args.backend == 'both' else [args.backend]
+    if len(backends) > 1 and (args.baseline or args.save_baseline):
+        print("--baseline/--save-baseline work with a single --backend.")
+        return 2
+
+    suites = {}
+    for backend in backends:
+        print(f"\n[{backend}]")
+        results = run_suite(args, names, backend)
+        if results is None:
+            return 2
+        suites[backend] = results
+
+    if len(backends) > 1:
+        print_backend_comparison(suites, names)
+        return 0
+    results = suites[backends[0]]
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions (> {args.threshold:.0f}% worse than {args.baseline}):")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}.")
+    return 0
+
+
+def run_suite(args: argparse.Namespace, names: List[str], backend: str) -> Optional[Dict]:
+    """Seed the chosen backend and run each named operation; None if it can't be set up."""
+    storage = SQLiteBackend(args.sqlite_path) if backend == 'sqlite' else None
+    db_manager = DatabaseManager(pool_size=args.concurrency, bcrypt_rounds=SEED_BCRYPT_ROUNDS,
+                                 slow_op_ms=float('inf'), backend=storage)
+    if not db_manager.connect_to_mysql(args.password, args.host, args.user, args.port):
+        return None
+    if not (db_manager.create_database(args.database) and db_manager.migrate()):
+        return None
+    seed(db_manager, args.scale, args.seed)
+    db_manager.bcrypt_rounds = args.bcrypt_rounds
+
+    run_id = str(int(time.time()))
+    operations = build_operations(db_manager, args.scale, args.seed, run_id)
+    results = {'backend': backend, 'scale': args.scale, 'concurrency': args.concurrency, 'operations': {}}
+
+    print(f"\n{'Operation':<14} {'Ops':>7} {'Ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8}")
+    print("-" * 72)
+    for name in names:
+        op, multiplier = operations[name]
+        ops = max(1, int(args.ops * multiplier))
+        # The manager reports every call on stdout; keep that out of the results table
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            result = run_operation(name, op, ops, args.concurrency)
+        results['operations'][name] = result
+        rss = f"{result['peak_rss_mb']:.0f}" if result['peak_rss_mb'] is not None else "n/a"
+        print(f"{name:<14} {result['ops']:>7} {result['throughput']:>10.1f} {result['p50_ms']:>9.2f} "
+              f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} {rss:>8}")
+
+    db_manager.close_connection()
+    return results
+
+
+def print_backend_comparison(suites: Dict, names: List[str]):
+    """Print p50/p99 latency of each operation on MySQL next to SQLite."""
+    mysql_ops, sqlite_ops = suites['mysql']['operations'], suites['sqlite']['operations']
+    print(f"\n{'Operation':<14} {'MySQL p50':>10} {'SQLite p50':>11} {'MySQL p99':>10} {'SQLite p99':>11} {'p50 ratio':>10}")
+    print("-" * 71)
+    for name in names:
+        mysql_result, sqlite_result = mysql_ops[name], sqlite_ops[name]
+        ratio = mysql_result['p50_ms'] / sqlite_result['p50_ms'] if sqlite_result['p50_ms'] else float('inf')
+        print(f"{name:<14} {mysql_result['p50_ms']:>10.3f} {sqlite_result['p50_ms']:>11.3f} "
+              f"{mysql_result['p99_ms']:>10.3f} {sqlite_result['p99_ms']:>11.3f} {ratio:>9.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())